@@ -0,0 +1,890 @@
+"""
+Searcharr
+Sonarr, Radarr & Readarr Telegram Bot
+Shared Arr API Client
+By Todd Roberts
+https://github.com/toddrob99/searcharr
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import copy
+from datetime import datetime, timedelta
+import hashlib
+import ijson
+import json
+import random
+import re
+import requests
+from requests.adapters import HTTPAdapter
+import socket
+from threading import Condition, Event, Lock, Timer
+import time
+import urllib3
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from cache import ApiVersionCache
+from library import Library, Records
+from log import set_up_logger
+
+_dns_cache = {}
+_dns_cache_lock = Lock()
+
+
+def _cached_addresses(host, port, ttl):
+    key = (host, port)
+    now = time.monotonic()
+    with _dns_cache_lock:
+        cached = _dns_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    r = list(
+        dict.fromkeys(
+            x[4][0] for x in socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        )
+    )
+    with _dns_cache_lock:
+        _dns_cache[key] = (now + ttl, r)
+    return r
+
+
+class CachedDNSConnectionMixin(object):
+    # Connects to the cached addresses of the host, trying each in turn. Certificates
+    # are still checked against the host name, since only the address to dial changes.
+    dns_cache_ttl = 300
+
+    def _new_conn(self):
+        host = self._dns_host
+        try:
+            addresses = _cached_addresses(host, self.port, self.dns_cache_ttl)
+        except OSError:
+            # Let urllib3 report the failed lookup
+            return super()._new_conn()
+
+        for i, address in enumerate(addresses):
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except Exception:
+                if i == len(addresses) - 1:
+                    raise
+            finally:
+                self._dns_host = host
+
+
+class CachedDNSAdapter(HTTPAdapter):
+    # DNS lookups are cached for connections to the Arr only, leaving other libraries alone
+    def __init__(self, dns_cache_ttl=300, **kwargs):
+        self.dns_cache_ttl = dns_cache_ttl
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        attrs = {"dns_cache_ttl": self.dns_cache_ttl}
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: type(
+                pool.__name__,
+                (pool,),
+                {
+                    "ConnectionCls": type(
+                        conn.__name__, (CachedDNSConnectionMixin, conn), attrs
+                    )
+                },
+            )
+            for scheme, pool, conn in [
+                ("http", HTTPConnectionPool, HTTPConnection),
+                ("https", HTTPSConnectionPool, HTTPSConnection),
+            ]
+        }
+
+
+class BackendUnavailable(Exception):
+    def __init__(self, app_name, retry_in):
+        super().__init__(
+            f"{app_name} is unavailable; retrying in {max(retry_in, 0):.0f} seconds"
+        )
+        self.app_name = app_name
+        self.retry_in = max(retry_in, 0)
+
+
+class CircuitBreaker(object):
+    # Fails fast after repeated failures, letting one trial request through after a cool-down
+    def __init__(self, name, threshold=5, reset_timeout=30):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = Lock()
+
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def retry_in(self):
+        if self._opened_at is None:
+            return 0
+        return max(self._opened_at + self.reset_timeout - time.monotonic(), 0)
+
+    def before_request(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self.retry_in() > 0 or self._trial:
+                raise BackendUnavailable(self.name, self.retry_in())
+            self._trial = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self._opened_at is not None or self.failures >= self.threshold:
+                tripped = self._opened_at is None
+                self.trips += tripped
+                self._opened_at = time.monotonic()
+                return tripped
+            return False
+
+    def stats(self):
+        return {
+            "state": self.state(),
+            "failures": self.failures,
+            "trips": self.trips,
+            "retry_in": round(self.retry_in()),
+        }
+
+
+class ConcurrencyLimiter(object):
+    # Bounds in-flight requests with an AIMD limit: it grows by about one per round of
+    # healthy responses and halves when responses slow down or fail. Callers queue in order.
+    def __init__(self, initial=4, min_limit=1, max_limit=10, tolerance=2.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.limit = float(max(min(initial, max_limit), min_limit))
+        self.in_flight = 0
+        self.queued_total = 0
+        self.max_queue_depth = 0
+        self.decreases = 0
+        self._queue = deque()
+        self._baselines = {}
+        self._last_decrease = 0
+        self._cond = Condition()
+
+    def acquire(self):
+        ticket = object()
+        with self._cond:
+            self._queue.append(ticket)
+            if len(self._queue) > 1 or self.in_flight >= int(self.limit):
+                self.queued_total += 1
+                self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            while self._queue[0] is not ticket or self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self._queue.popleft()
+            self.in_flight += 1
+            # The next caller in line may be able to go as well
+            self._cond.notify_all()
+        return time.monotonic()
+
+    def release(self, key, started, ok=True):
+        latency = time.monotonic() - started
+        with self._cond:
+            self.in_flight -= 1
+            baseline = self._baselines.get(key, latency)
+            if not ok or latency > baseline * self.tolerance:
+                # Only back off once for requests that were already in flight together
+                if started > self._last_decrease:
+                    self.limit = max(self.limit / 2, self.min_limit)
+                    self._last_decrease = time.monotonic()
+                    self.decreases += 1
+            else:
+                self.limit = min(self.limit + 1 / self.limit, self.max_limit)
+            if ok:
+                # The baseline follows faster responses quickly and slower ones slowly
+                self._baselines[key] = min(
+                    latency, baseline + (latency - baseline) / 20
+                )
+            self._cond.notify_all()
+
+    def stats(self):
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": len(self._queue),
+            "max_queue_depth": self.max_queue_depth,
+            "queued_total": self.queued_total,
+            "decreases": self.decreases,
+        }
+
+
+class SearchScheduler(object):
+    # Collects post-add searches for a short window and submits them together, optionally
+    # holding them until the off-peak hours [start, end) so bursts of adds don't hammer the indexers
+    def __init__(self, submit, window=10, off_peak=None, logger=None):
+        self.submit = submit
+        self.window = window
+        self.off_peak = off_peak
+        self.logger = logger
+        self.max_queue_depth = 0
+        self.batches = 0
+        self.searched = 0
+        self.largest_batch = 0
+        self.failed = 0
+        self._pending = []
+        self._timer = None
+        self._lock = Lock()
+
+    def schedule(self, id):
+        with self._lock:
+            if id not in self._pending:
+                self._pending.append(id)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._pending))
+            if not self._timer:
+                self._timer = Timer(self._delay(), self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            ids, self._pending = self._pending, []
+            self._timer = None
+        if not ids:
+            return
+        if self.logger:
+            self.logger.debug(f"Submitting search for {len(ids)} item(s): {ids}")
+        try:
+            self.submit(ids)
+        except Exception as e:
+            with self._lock:
+                self.failed += len(ids)
+            if self.logger:
+                self.logger.error(f"Error submitting search for {ids}: {e}")
+            return
+        with self._lock:
+            self.batches += 1
+            self.searched += len(ids)
+            self.largest_batch = max(self.largest_batch, len(ids))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "max_queue_depth": self.max_queue_depth,
+                "batches": self.batches,
+                "searched": self.searched,
+                "largest_batch": self.largest_batch,
+                "failed": self.failed,
+            }
+
+    def _delay(self):
+        if not self.off_peak:
+            return self.window
+        start, end = self.off_peak
+        now = datetime.now()
+        if (start <= now.hour < end) if start < end else not (end <= now.hour < start):
+            return self.window
+        opens = now.replace(hour=start, minute=0, second=0, microsecond=0)
+        if opens <= now:
+            opens += timedelta(days=1)
+        return max((opens - now).total_seconds(), self.window)
+
+
+class HashingReader(object):
+    # Hashes a response body as it is read by the parser, giving up once the deadline
+    # passes. Errors reading the body are raised as the requests errors they stand for,
+    # so they are retried and counted against the backend like any other failed request.
+    # Reads are kept small so a slowly trickling body can't run far past the deadline.
+    chunk_size = 8192
+
+    def __init__(self, f, digest, deadline=None):
+        self._f = f
+        self.digest = digest
+        self.deadline = deadline
+
+    def read(self, size=-1):
+        if self.deadline and time.monotonic() > self.deadline:
+            raise requests.exceptions.ReadTimeout(
+                "Deadline passed while reading the response body"
+            )
+        try:
+            data = self._f.read(
+                self.chunk_size if size < 0 else min(size, self.chunk_size)
+            )
+        except urllib3.exceptions.ReadTimeoutError as e:
+            raise requests.exceptions.ReadTimeout(e)
+        except urllib3.exceptions.HTTPError as e:
+            raise requests.exceptions.ChunkedEncodingError(e)
+        self.digest.update(data)
+        return data
+
+
+def is_transient(e):
+    # Errors worth retrying: the server could not be reached or failed to respond
+    if isinstance(e, requests.exceptions.HTTPError):
+        return e.response is not None and e.response.status_code >= 500
+    return isinstance(
+        e,
+        (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+            requests.exceptions.ChunkedEncodingError,
+        ),
+    )
+
+
+class Arr(object):
+    app_name = "Arr"
+    api_version = "v3"
+    tag_cache_ttl = 300
+    # Read timeouts for endpoints that need more or less than the default
+    endpoint_timeouts = {"system/status": 10, "tag": 10}
+
+    def __init__(
+        self,
+        verbose=False,
+        pool_size=10,
+        connect_timeout=5,
+        read_timeout=30,
+        dns_cache_ttl=300,
+        lookup_cache=None,
+        version_cache_ttl=86400,
+        retries=2,
+        retry_backoff=0.5,
+        breaker_threshold=5,
+        breaker_reset=30,
+        min_concurrency=1,
+        max_concurrency=10,
+        name=None,
+        search_batch_window=10,
+        search_off_peak=None,
+    ):
+        # Instances other than the app's default one are told apart by name
+        self.name = name or self.app_name
+        self.slug = slugify(self.name)
+        self.logger = set_up_logger(
+            f"searcharr.{self.app_name.lower()}"
+            + (f".{self.slug}" if self.name != self.app_name else ""),
+            verbose,
+            False,
+        )
+        self.logger.debug("Logging started!")
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.breaker = CircuitBreaker(
+            self.name, threshold=breaker_threshold, reset_timeout=breaker_reset
+        )
+        self.limiter = ConcurrencyLimiter(
+            min_limit=min_concurrency, max_limit=max_concurrency
+        )
+        self._searches = (
+            SearchScheduler(
+                self._search_command,
+                window=search_batch_window,
+                off_peak=search_off_peak,
+                logger=self.logger,
+            )
+            if search_batch_window or search_off_peak
+            else None
+        )
+        self.version = None
+        self.api_url = None
+        self.api_path = None
+        self._base_url = None
+        self._api_key = None
+        self._api_path_cached = False
+        self._discovery_lock = Lock()
+        self._versions = (
+            ApiVersionCache(ttl=version_cache_ttl, logger=self.logger)
+            if version_cache_ttl
+            else None
+        )
+        self._lookup_cache = lookup_cache
+        self._libraries = []
+        self.startup_timings = {}
+        self._tags = {"ts": 0, "tags": {}}
+        self._tags_lock = Lock()
+        self._in_flight = {}
+        self._in_flight_lock = Lock()
+        self.coalesced_requests = 0
+        # Validators, body hash and parsed result of the last response for each unparameterized GET
+        self._validators = {}
+        self.transfers = {}
+        self._transfers_lock = Lock()
+        self.timeout = (connect_timeout, read_timeout)
+        self._session = requests.Session()
+        # Responses are compressed whenever the server supports it
+        self._session.headers["Accept-Encoding"] = "gzip, deflate"
+        adapter = (
+            CachedDNSAdapter(dns_cache_ttl, pool_connections=1, pool_maxsize=pool_size)
+            if dns_cache_ttl
+            else HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def close(self):
+        self._session.close()
+
+    def _timed(self, phase, f, *args):
+        start = time.monotonic()
+        try:
+            return f(*args)
+        finally:
+            self.startup_timings[phase] = time.monotonic() - start
+
+    def _bootstrap(self, **fetchers):
+        # Fetch independent startup resources concurrently, timing each phase
+        with ThreadPoolExecutor(
+            max_workers=len(fetchers),
+            thread_name_prefix=f"{self.app_name.lower()}-startup",
+        ) as executor:
+            futures = {
+                phase: executor.submit(self._timed, phase, f)
+                for phase, f in fetchers.items()
+            }
+        return {phase: f.result() for phase, f in futures.items()}
+
+    def stats(self):
+        with self._transfers_lock:
+            transfers = {
+                k: dict(v, parse_time_saved=round(v["parse_time_saved"], 3))
+                for k, v in self.transfers.items()
+            }
+        return {
+            "libraries": {x.name: x.stats() for x in self._libraries},
+            "coalesced_requests": self.coalesced_requests,
+            "breaker": self.breaker.stats(),
+            "limiter": self.limiter.stats(),
+            "searches": self._searches.stats() if self._searches else None,
+            "transfers": transfers,
+        }
+
+    def _search_command(self, ids):
+        # Searches for the given library items in a single command
+        raise NotImplementedError
+
+    def set_library_ttl(self, ttl):
+        for x in self._libraries:
+            x.ttl = ttl
+
+    def _library(self, name, index_keys, endpoint, fields=None):
+        library = Library(
+            name,
+            index_keys,
+            fetch=lambda: self._api_get(endpoint, {}, fields=fields),
+            fields=fields,
+            logger=self.logger,
+        )
+        self._libraries.append(library)
+        return library
+
+    def _cached_lookup(self, term, lookup):
+        # Serve repeated searches from the shared lookup cache, if enabled
+        if not self._lookup_cache:
+            return lookup()
+
+        r = self._lookup_cache.get(self.name, term)
+        if r is None:
+            r = lookup()
+            if r:
+                self._lookup_cache.set(self.name, term, r)
+        return r
+
+    def _invalidate_lookups(self):
+        if self._lookup_cache:
+            self.logger.debug("Invalidating cached lookups...")
+            self._lookup_cache.invalidate(self.name)
+
+    def get_all_tags(self, refresh=False):
+        # Tags are served from a label -> tag catalog that is refreshed after a TTL
+        if refresh or self._tags["ts"] < time.time() - self.tag_cache_ttl:
+            r = self._api_get("tag", {})
+            self.logger.debug(f"Result of API call to get all tags: {r}")
+            with self._tags_lock:
+                self._tags = {
+                    "ts": time.time(),
+                    "tags": {x["label"].lower(): x for x in r or []},
+                }
+
+        return list(self._tags["tags"].values())
+
+    def get_filtered_tags(self, allowed_tags, excluded_tags):
+        return filter_tags(self.get_all_tags(), allowed_tags, excluded_tags)
+
+    def add_tag(self, tag):
+        params = {
+            "label": tag,
+        }
+        try:
+            t = self._api_post("tag", params)
+        except requests.HTTPError as e:
+            # The tag may have been created in the Arr since the catalog was cached
+            if e.response is None or not 400 <= e.response.status_code < 500:
+                raise
+            self.logger.debug(
+                f"Adding tag [{tag}] failed ({e}). Refreshing the tag catalog..."
+            )
+            self.get_all_tags(refresh=True)
+            if t := self._tags["tags"].get(tag.lower()):
+                return t
+            raise
+        self.logger.debug(f"Result of API call to add tag: {t}")
+        if isinstance(t, dict) and t.get("id"):
+            with self._tags_lock:
+                self._tags["tags"][t["label"].lower()] = t
+        return t
+
+    def get_tag_id(self, tag):
+        return self.ensure_tags([tag]).get(tag)
+
+    def ensure_tags(self, tags):
+        # Return a tag -> id dict, creating any tags that do not exist yet
+        self.get_all_tags()
+        tag_ids = {}
+        for tag in tags:
+            if t := self._tags["tags"].get(tag.lower()):
+                self.logger.debug(f"Found tag id [{t['id']}] for tag [{tag}]")
+                tag_ids[tag] = t["id"]
+                continue
+
+            self.logger.debug(f"No tag id found for [{tag}]; adding...")
+            t = self.add_tag(tag)
+            if not isinstance(t, dict):
+                self.logger.error(
+                    f"Wrong data type returned from {self.app_name} API when attempting to add tag [{tag}]. Expected dict, got {type(t)}."
+                )
+                tag_ids[tag] = None
+                continue
+
+            self.logger.debug(
+                f"Created tag id for tag [{tag}]: {t['id']}"
+                if t.get("id")
+                else f"Could not add tag [{tag}]"
+            )
+            tag_ids[tag] = t.get("id", None)
+        return tag_ids
+
+    def discover_version(self, api_url, api_key, refresh=False):
+        self._base_url = api_url
+        self._api_key = api_key
+        cached = (
+            self._versions.get(self.app_name, api_url)
+            if self._versions and not refresh
+            else None
+        )
+        if cached:
+            # Trust the API base found on a previous run; it is re-probed if a request fails
+            self._set_api_path(cached["path"])
+            self._api_path_cached = True
+            self.version = cached["version"]
+            self.logger.debug(
+                f"Using previously discovered {self.app_name} version {self.version} with API base [{self.api_path}]."
+            )
+            return self.version
+
+        self._api_path_cached = False
+        for name, path in [
+            (self.api_version, f"/api/{self.api_version}"),
+            ("legacy", "/api"),
+        ]:
+            self._set_api_path(path)
+            try:
+                info = self._get("system/status")
+            except requests.exceptions.HTTPError as e:
+                self.logger.debug(f"{self.app_name} {name} API threw exception: {e}")
+                continue
+
+            self.version = info.get("version")
+            if name == "legacy":
+                self.logger.warning(
+                    f"Discovered {self.app_name} version {self.version}. Using legacy API. Consider upgrading to the latest version of {self.app_name} for the best experience."
+                )
+            else:
+                self.logger.debug(
+                    f"Discovered {self.app_name} version {self.version}. Using {name} api."
+                )
+            self._set_api_path(self._select_api_path(self.version, path))
+            if self._versions:
+                self._versions.set(self.app_name, api_url, self.api_path, self.version)
+            return self.version
+
+        self.logger.debug(f"Failed to discover {self.app_name} version")
+        self.version = None
+        return None
+
+    def _select_api_path(self, version, path):
+        # Override to pick a different API base for some versions
+        return path
+
+    def _set_api_path(self, path):
+        self.api_path = path
+        self.api_url = self._base_url + path + "/{endpoint}?apikey=" + self._api_key
+
+    def _api_get(self, endpoint, params={}, fields=None):
+        # Identical concurrent GETs share a single request to the server
+        return self._single_flight(
+            (endpoint, tuple(params.items()), tuple(fields or ())),
+            lambda: self._request_get(endpoint, params, fields),
+        )
+
+    def _single_flight(self, key, f):
+        with self._in_flight_lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = {
+                    "done": Event(),
+                    "result": None,
+                    "error": None,
+                }
+            else:
+                self.coalesced_requests += 1
+
+        if not leader:
+            self.logger.debug(f"Waiting for in-flight request for {key}")
+            flight["done"].wait()
+            if flight["error"]:
+                raise flight["error"]
+            # Each caller gets its own copy, since results may be modified
+            return copy.deepcopy(flight["result"])
+
+        try:
+            flight["result"] = f()
+            return flight["result"]
+        except Exception as e:
+            flight["error"] = e
+            raise
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[key]
+            flight["done"].set()
+
+    def _request_get(self, endpoint, params={}, fields=None):
+        api_url = self.api_url
+        try:
+            return self._get(endpoint, params, fields)
+        except requests.exceptions.HTTPError as e:
+            if is_transient(e):
+                raise
+            with self._discovery_lock:
+                # Another request may have already discovered the version again
+                if self.api_url == api_url:
+                    if not self._api_path_cached:
+                        raise
+                    self.logger.warning(
+                        f"Request using the previously discovered {self.app_name} API base failed ({e}). Discovering version again..."
+                    )
+                    if self._versions:
+                        self._versions.invalidate(self.app_name, self._base_url)
+                    self.discover_version(self._base_url, self._api_key, refresh=True)
+            return self._get(endpoint, params, fields)
+
+    def _get(self, endpoint, params={}, fields=None):
+        url = self.api_url.format(endpoint=endpoint)
+        for k, v in params.items():
+            url += f"&{k}={v}"
+        timeout = self._timeout(endpoint)
+        # Retries with jittered exponential backoff, as long as they fit in the endpoint's deadline.
+        # Each attempt only gets the time left before the deadline to respond.
+        deadline = time.monotonic() + timeout[1]
+        attempt = 0
+        while True:
+            self.logger.debug(f"Submitting GET request: [{url}]")
+            attempt_timeout = (
+                timeout[0],
+                max(min(timeout[1], deadline - time.monotonic()), 0.001),
+            )
+            try:
+                return self._send(
+                    endpoint,
+                    lambda: self._get_once(
+                        endpoint,
+                        url,
+                        attempt_timeout,
+                        fields,
+                        conditional=not params,
+                        deadline=deadline,
+                    ),
+                )
+            except Exception as e:
+                delay = random.uniform(0, self.retry_backoff * 2**attempt)
+                if (
+                    not is_transient(e)
+                    or attempt >= self.retries
+                    # Not worth retrying without time left to connect and get a response
+                    or deadline - time.monotonic() - delay < timeout[0]
+                ):
+                    raise
+                attempt += 1
+                self.logger.warning(
+                    f"GET request for [{endpoint}] failed ({e}). Retrying in {delay:.2f}s (attempt {attempt} of {self.retries})..."
+                )
+                time.sleep(delay)
+
+    def _get_once(
+        self, endpoint, url, timeout, fields=None, conditional=False, deadline=None
+    ):
+        previous = self._validators.get(url) if conditional else None
+        headers = {}
+        if previous and previous["etag"]:
+            headers["If-None-Match"] = previous["etag"]
+        if previous and previous["last_modified"]:
+            headers["If-Modified-Since"] = previous["last_modified"]
+        with self._session.get(url, headers=headers, timeout=timeout, stream=True) as r:
+            if r.status_code == 304 and previous:
+                self._count_transfer(
+                    endpoint, r, "not_modified", previous["parse_time"]
+                )
+                return self._reuse(previous["result"])
+            if r.status_code not in [200, 201, 202, 204]:
+                r.raise_for_status()
+                return None
+
+            digest = hashlib.sha1()
+            r.raw.decode_content = True
+            body = HashingReader(r.raw, digest, deadline)
+            if fields is None:
+                content = b"".join(iter(lambda: body.read(65536), b""))
+                if previous and previous["hash"] == digest.digest():
+                    # Same body as last time, so there's no need to parse it again
+                    self._count_transfer(
+                        endpoint, r, "unchanged", previous["parse_time"]
+                    )
+                    return self._reuse(previous["result"])
+                start = time.monotonic()
+                result = json.loads(content)
+            else:
+                # Parse a list response one item at a time, keeping only the requested fields.
+                # The body is hashed as it streams by, so an unchanged library keeps its
+                # previous records (and the indexes built from them).
+                start = time.monotonic()
+                result = Records(fields, ijson.items(body, "item", use_float=True))
+                if previous and previous["hash"] == digest.digest():
+                    self._count_transfer(endpoint, r, "unchanged")
+                    return previous["result"]
+            parse_time = time.monotonic() - start
+            self._count_transfer(endpoint, r)
+            if conditional:
+                self._validators[url] = {
+                    "etag": r.headers.get("ETag"),
+                    "last_modified": r.headers.get("Last-Modified"),
+                    "hash": digest.digest(),
+                    "result": self._reuse(result),
+                    "parse_time": parse_time,
+                }
+            return result
+
+    def _reuse(self, result):
+        # Records are never modified in place, but anything else may be
+        return result if isinstance(result, Records) else copy.deepcopy(result)
+
+    def _count_transfer(self, endpoint, r, outcome=None, parse_time_saved=0):
+        # Bytes read off the wire, i.e. before decompression
+        size = r.raw.tell()
+        with self._transfers_lock:
+            transfer = self.transfers.setdefault(
+                endpoint,
+                {
+                    "requests": 0,
+                    "bytes": 0,
+                    "not_modified": 0,
+                    "unchanged": 0,
+                    "parse_time_saved": 0,
+                },
+            )
+            transfer["requests"] += 1
+            transfer["bytes"] += size
+            if outcome:
+                transfer[outcome] += 1
+            transfer["parse_time_saved"] += parse_time_saved
+
+    def _api_post(self, endpoint, params={}):
+        url = self.api_url.format(endpoint=endpoint)
+        self.logger.debug(f"Submitting POST request: [{url}]; params: [{params}]")
+        return self._send(
+            endpoint, lambda: self._post_once(url, params, self._timeout(endpoint))
+        )
+
+    def _post_once(self, url, params, timeout):
+        r = self._session.post(url, json=params, timeout=timeout)
+        if r.status_code not in [200, 201, 202, 204]:
+            r.raise_for_status()
+            return None
+        else:
+            return r.json()
+
+    def _send(self, endpoint, request):
+        # Every request goes through the backend's circuit breaker and concurrency limit
+        self.breaker.before_request()
+        started = self.limiter.acquire()
+        try:
+            r = request()
+        except Exception as e:
+            self.limiter.release(endpoint, started, ok=not is_transient(e))
+            if is_transient(e):
+                if self.breaker.record_failure():
+                    self.logger.error(
+                        f"{self.app_name} is not responding. Failing fast for the next {self.breaker.reset_timeout} seconds."
+                    )
+            else:
+                # The server responded, even if it was with an error
+                self.breaker.record_success()
+            raise
+        self.limiter.release(endpoint, started)
+        self.breaker.record_success()
+        return r
+
+    def _timeout(self, endpoint):
+        return (self.timeout[0], self.endpoint_timeouts.get(endpoint, self.timeout[1]))
+
+
+def slugify(name):
+    # Instance names are turned into slugs for webhook paths and logger names
+    return re.sub(r"[^a-z0-9]+", "-", str(name).lower()).strip("-")
+
+
+def format_root_folders(r):
+    if not r:
+        return []
+
+    return [
+        {
+            "path": x.get("path"),
+            "freeSpace": x.get("freeSpace"),
+            "totalSpace": x.get("totalSpace"),
+            "id": x.get("id"),
+        }
+        for x in r
+    ]
+
+
+def filter_tags(tags, allowed_tags, excluded_tags):
+    if not tags:
+        return []
+    elif allowed_tags == []:
+        return [
+            x
+            for x in tags
+            if not x["label"].startswith("searcharr-")
+            and not x["label"] in excluded_tags
+        ]
+    else:
+        return [
+            x
+            for x in tags
+            if not x["label"].startswith("searcharr-")
+            and (x["label"] in allowed_tags or x["id"] in allowed_tags)
+            and x["label"] not in excluded_tags
+        ]
@@ -0,0 +1,123 @@
+"""
+Searcharr
+Sonarr, Radarr & Readarr Telegram Bot
+Benchmark: memory used by the cached series library
+By Todd Roberts
+https://github.com/toddrob99/searcharr
+
+Loads a synthetic 50,000 series /series response and measures the memory held by
+the cached library when storing the full parsed items (as before), the same items
+trimmed to the fields Searcharr uses, and the column-backed Records streamed in
+with ijson (as now). Both of the latter include the tvdbId and imdbId indexes.
+Usage: python benchmarks/library_memory.py [number of series]
+"""
+import gc
+import io
+import json
+import os
+import sys
+import tracemalloc
+
+import ijson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from library import Library, Records  # noqa: E402
+from sonarr import SERIES_FIELDS  # noqa: E402
+
+
+def series(i):
+    # Roughly the shape of one item of Sonarr's /api/v3/series response
+    return {
+        "id": i,
+        "title": f"Series Title {i}",
+        "sortTitle": f"series title {i}",
+        "status": "continuing" if i % 3 else "ended",
+        "ended": i % 3 == 0,
+        "overview": f"Overview of series {i}. " * 8,
+        "network": f"Network {i % 50}",
+        "airTime": "21:00",
+        "images": [
+            {
+                "coverType": t,
+                "url": f"/MediaCover/{i}/{t}.jpg",
+                "remoteUrl": f"https://artworks.thetvdb.com/banners/{t}s/{i}.jpg",
+            }
+            for t in ["banner", "poster", "fanart"]
+        ],
+        "seasons": [
+            {
+                "seasonNumber": s,
+                "monitored": True,
+                "statistics": {"episodeFileCount": 10, "episodeCount": 10},
+            }
+            for s in range(1, 4)
+        ],
+        "year": 1990 + i % 30,
+        "path": f"/tv/Series Title {i}",
+        "qualityProfileId": 1,
+        "seasonFolder": True,
+        "monitored": True,
+        "runtime": 45,
+        "tvdbId": 100000 + i,
+        "tvRageId": 0,
+        "tvMazeId": 200000 + i,
+        "seriesType": "standard",
+        "cleanTitle": f"seriestitle{i}",
+        "imdbId": f"tt{1000000 + i}",
+        "titleSlug": f"series-title-{i}",
+        "genres": ["Drama", "Crime"],
+        "tags": [],
+        "added": "2020-01-01T00:00:00Z",
+        "ratings": {"votes": i % 1000, "value": 7.5},
+        "statistics": {"seasonCount": 3, "episodeCount": 30, "sizeOnDisk": i * 1000},
+    }
+
+
+def measure(load, data, count):
+    # Memory still held by the loaded library, and the peak while loading it
+    gc.collect()
+    tracemalloc.start()
+    library = load(data)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(library.get_all()) == count
+    return current, peak
+
+
+def full_dicts(data):
+    library = Library("series", ["tvdbId", "imdbId"])
+    library._snapshot = dict(library._snapshot, items=json.loads(data))
+    return library
+
+
+def trimmed_dicts(data):
+    library = Library("series", ["tvdbId", "imdbId"])
+    items = [{k: x.get(k) for k in SERIES_FIELDS} for x in json.loads(data)]
+    index = {k: {x[k]: x["id"] for x in items if x[k]} for k in library.index_keys}
+    library._snapshot = dict(library._snapshot, items=items, index=index)
+    return library
+
+
+def records(data):
+    library = Library("series", ["tvdbId", "imdbId"], fields=SERIES_FIELDS)
+    items = ijson.items(io.BytesIO(data), "item", use_float=True)
+    library.load(Records(SERIES_FIELDS, items))
+    return library
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    data = json.dumps([series(i) for i in range(1, count + 1)]).encode("utf-8")
+    print(f"{count} series, {len(data) / 2**20:.1f} MiB of JSON")
+    print(f"{'':<32} {'held (MiB)':>12} {'peak (MiB)':>12} {'per item (B)':>14}")
+    for name, load in [
+        ("Full dicts (before)", full_dicts),
+        ("Kept fields as dicts, indexed", trimmed_dicts),
+        ("Records with indexes (after)", records),
+    ]:
+        current, peak = measure(load, data, count)
+        print(
+            f"{name:<32} {current / 2**20:>12.1f} {peak / 2**20:>12.1f} {current / count:>14.0f}"
+        )
@@ -0,0 +1,73 @@
+"""
+Searcharr
+Sonarr, Radarr & Readarr Telegram Bot
+Benchmark: "already in library" checks as the library grows
+By Todd Roberts
+https://github.com/toddrob99/searcharr
+
+Compares the time to check every result of a search against the series library
+by scanning the cached series list (as before) and by the library's tvdbId index.
+Usage: python benchmarks/lookup_index.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from library import Library  # noqa: E402
+from sonarr import SERIES_FIELDS  # noqa: E402
+
+SIZES = [100, 1000, 5000, 20000, 50000]
+RESULTS = 50  # results in a typical series lookup
+REPEAT = 5
+
+
+def series(n):
+    return [
+        {
+            "id": i,
+            "title": f"Series {i}",
+            "tvdbId": 100000 + i,
+            "imdbId": f"tt{1000000 + i}",
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def scan_id(all_series, tvdb_id):
+    return next(
+        (x["id"] for x in all_series if x.get("tvdbId", 0) == tvdb_id),
+        None,
+    )
+
+
+def best_of(f, number):
+    return min(timeit.repeat(f, number=number, repeat=REPEAT)) / number
+
+
+def main():
+    print(f"Checking {RESULTS} lookup results against the library, per search:")
+    print(f"{'series':>8} {'scan (ms)':>12} {'index (ms)':>12} {'speedup':>10}")
+    for n in SIZES:
+        items = series(n)
+        library = Library("series", ["tvdbId", "imdbId"], fields=SERIES_FIELDS)
+        library.load(items)
+        # Half of the results are already in the library, spread across it, and
+        # half are not, which means a full scan each for the list.
+        results = [100000 + (i * n // RESULTS) + 1 for i in range(RESULTS // 2)]
+        results += [900000 + i for i in range(RESULTS - len(results))]
+        assert [scan_id(items, x) for x in results] == [
+            library.find_id(tvdbId=x) for x in results
+        ]
+
+        number = max(1, 20000 // n)
+        scan = best_of(lambda: [scan_id(items, x) for x in results], number)
+        index = best_of(lambda: [library.find_id(tvdbId=x) for x in results], 200)
+        print(
+            f"{n:>8} {scan * 1000:>12.3f} {index * 1000:>12.3f} {scan / index:>9.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
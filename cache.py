@@ -0,0 +1,187 @@
+"""
+Searcharr
+Sonarr, Radarr & Readarr Telegram Bot
+Lookup Cache
+By Todd Roberts
+https://github.com/toddrob99/searcharr
+"""
+from collections import OrderedDict
+import json
+import os
+import sqlite3
+from threading import Lock
+import time
+
+DBPATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data")
+DBFILE = "lookup_cache.db"
+VERSIONFILE = "api_versions.json"
+_versions_lock = Lock()
+
+
+class LookupCache(object):
+    def __init__(self, ttl=300, max_size=256, persist=False, logger=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.logger = logger
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self._con = self._open_db() if persist else None
+
+    def get(self, backend, term):
+        key = (backend, self._normalize(term))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] < now - self.ttl:
+                del self._entries[key]
+                entry = None
+            if not entry and self._con:
+                entry = self._db_get(key, now)
+                if entry:
+                    self._store(key, entry)
+            if not entry:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        if self.logger:
+            self.logger.debug(
+                f"Lookup cache hit for [{backend}] [{term}] ({self.hits} hits, {self.misses} misses)"
+            )
+        # Hand out a fresh copy so callers can mutate the results
+        return json.loads(entry[1])
+
+    def set(self, backend, term, results):
+        key = (backend, self._normalize(term))
+        entry = (time.time(), json.dumps(results))
+        with self._lock:
+            self._store(key, entry)
+            if self._con:
+                self._db_execute(
+                    "INSERT OR REPLACE INTO lookups (backend, term, ts, results) VALUES (?, ?, ?, ?)",
+                    (*key, *entry),
+                )
+
+    def invalidate(self, backend=None):
+        with self._lock:
+            for key in [k for k in self._entries if backend in [None, k[0]]]:
+                del self._entries[key]
+            if self._con:
+                if backend:
+                    self._db_execute("DELETE FROM lookups WHERE backend=?", (backend,))
+                else:
+                    self._db_execute("DELETE FROM lookups")
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _normalize(self, term):
+        return " ".join(str(term).casefold().split())
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _open_db(self):
+        if not os.path.isdir(DBPATH):
+            os.mkdir(DBPATH)
+        con = sqlite3.connect(
+            os.path.join(DBPATH, DBFILE), timeout=30, check_same_thread=False
+        )
+        con.execute(
+            """CREATE TABLE IF NOT EXISTS lookups (
+                backend text,
+                term text,
+                ts real,
+                results text,
+                primary key (backend, term)
+            );"""
+        )
+        con.execute("DELETE FROM lookups WHERE ts < ?", (time.time() - self.ttl,))
+        con.commit()
+        return con
+
+    def _db_get(self, key, now):
+        try:
+            r = self._con.execute(
+                "SELECT ts, results FROM lookups WHERE backend=? AND term=? AND ts >= ?",
+                (*key, now - self.ttl),
+            ).fetchone()
+        except sqlite3.Error as e:
+            if self.logger:
+                self.logger.error(f"Error reading lookup cache from disk: {e}")
+            return None
+
+        return tuple(r) if r else None
+
+    def _db_execute(self, q, qa=()):
+        try:
+            self._con.execute(q, qa)
+            self._con.commit()
+        except sqlite3.Error as e:
+            if self.logger:
+                self.logger.error(f"Error writing lookup cache to disk: {e}")
+
+
+class ApiVersionCache(object):
+    # Remembers the version and API base discovered for each Arr URL across restarts
+    def __init__(self, ttl=86400, logger=None):
+        self.ttl = ttl
+        self.logger = logger
+        self._file = os.path.join(DBPATH, VERSIONFILE)
+
+    def get(self, app, url):
+        entry = self._read().get(f"{app} {url}")
+        if not entry or entry.get("ts", 0) < time.time() - self.ttl:
+            return None
+        return entry
+
+    def set(self, app, url, path, version):
+        with _versions_lock:
+            versions = self._read()
+            versions[f"{app} {url}"] = {
+                "path": path,
+                "version": version,
+                "ts": time.time(),
+            }
+            self._write(versions)
+
+    def invalidate(self, app, url):
+        with _versions_lock:
+            versions = self._read()
+            if versions.pop(f"{app} {url}", None):
+                self._write(versions)
+
+    def _read(self):
+        try:
+            with open(self._file) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            if self.logger:
+                self.logger.error(
+                    f"Error reading discovered API versions from disk: {e}"
+                )
+            return {}
+
+    def _write(self, versions):
+        try:
+            if not os.path.isdir(DBPATH):
+                os.mkdir(DBPATH)
+            tmp = f"{self._file}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(versions, f)
+            os.replace(tmp, self._file)
+        except OSError as e:
+            if self.logger:
+                self.logger.error(f"Error writing discovered API versions to disk: {e}")
@@ -0,0 +1,140 @@
+"""
+Searcharr
+Sonarr, Radarr & Readarr Telegram Bot
+Background Job Queue
+By Todd Roberts
+https://github.com/toddrob99/searcharr
+"""
+import json
+import queue
+import sqlite3
+from threading import Condition, Lock, Thread
+import time
+
+
+class JobQueue(object):
+    # Runs jobs on worker threads, keeping them in the database until they finish
+    # so that jobs which were queued or running at shutdown are resumed on restart.
+    # The handler returns a truthy value once the job has completed. Jobs sharing a key,
+    # e.g. adds of the same item, run one at a time.
+    def __init__(self, db_file, handler, workers=2, keep_failed=604800, logger=None):
+        self.handler = handler
+        self.workers = workers
+        self.keep_failed = keep_failed
+        self.logger = logger
+        self.done = 0
+        self.failed = 0
+        self.running = 0
+        self._queue = queue.Queue()
+        self._lock = Lock()
+        self._key_done = Condition(self._lock)
+        self._running_keys = set()
+        self._threads = []
+        self._con = sqlite3.connect(db_file, timeout=30, check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode = WAL;")
+        self._con.execute("PRAGMA synchronous = NORMAL;")
+        self._con.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id integer primary key autoincrement,
+                kind text not null,
+                payload text,
+                status text not null,
+                attempts integer default 0,
+                error text,
+                created real,
+                updated real,
+                key text
+            );"""
+        )
+        # Add columns missing from databases created by older versions
+        columns = [x[1] for x in self._con.execute("PRAGMA table_info(jobs)")]
+        if "key" not in columns:
+            self._con.execute("ALTER TABLE jobs ADD COLUMN key text")
+        self._con.commit()
+
+    def start(self):
+        with self._lock:
+            self._con.execute(
+                "DELETE FROM jobs WHERE status='failed' AND updated < ?",
+                (time.time() - self.keep_failed,),
+            )
+            # Jobs that were running when we stopped are started over
+            self._con.execute("UPDATE jobs SET status='queued' WHERE status='running'")
+            self._con.commit()
+            pending = self._con.execute(
+                "SELECT id FROM jobs WHERE status='queued' ORDER BY id"
+            ).fetchall()
+        if pending and self.logger:
+            self.logger.info(f"Resuming {len(pending)} queued job(s)...")
+        for (id,) in pending:
+            self._queue.put(id)
+        for n in range(self.workers):
+            t = Thread(target=self._work, name=f"searcharr-job-{n}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, kind, payload, key=None):
+        now = time.time()
+        with self._lock:
+            cur = self._con.execute(
+                "INSERT INTO jobs (kind, payload, status, created, updated, key) VALUES (?, ?, 'queued', ?, ?, ?)",
+                (kind, json.dumps(payload), now, now, key),
+            )
+            self._con.commit()
+        if self.logger:
+            self.logger.debug(f"Queued {kind} job [{cur.lastrowid}]")
+        self._queue.put(cur.lastrowid)
+        return cur.lastrowid
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "running": self.running,
+            "done": self.done,
+            "failed": self.failed,
+        }
+
+    def _work(self):
+        while True:
+            id = self._queue.get()
+            with self._lock:
+                row = self._con.execute(
+                    "SELECT kind, payload, key FROM jobs WHERE id=? AND status='queued'",
+                    (id,),
+                ).fetchone()
+                if not row:
+                    continue
+                # Wait for any job with the same key, so this one sees its outcome
+                while row[2] and row[2] in self._running_keys:
+                    self._key_done.wait()
+                if row[2]:
+                    self._running_keys.add(row[2])
+                self._set_status(id, "running", attempts=True)
+                self.running += 1
+
+            error = None
+            try:
+                if not self.handler(row[0], json.loads(row[1])):
+                    error = "Job did not complete"
+            except Exception as e:
+                error = str(e)
+            with self._lock:
+                self.running -= 1
+                self._running_keys.discard(row[2])
+                self._key_done.notify_all()
+                if error:
+                    if self.logger:
+                        self.logger.error(f"{row[0]} job [{id}] failed: {error}")
+                    self._set_status(id, "failed", error=error)
+                    self.failed += 1
+                else:
+                    self._con.execute("DELETE FROM jobs WHERE id=?", (id,))
+                    self._con.commit()
+                    self.done += 1
+
+    def _set_status(self, id, status, attempts=False, error=None):
+        self._con.execute(
+            f"UPDATE jobs SET status=?, error=?, updated=?{', attempts=attempts+1' if attempts else ''} WHERE id=?",
+            (status, error, time.time(), id),
+        )
+        self._con.commit()
@@ -0,0 +1,239 @@
+"""
+Searcharr
+Sonarr, Radarr & Readarr Telegram Bot
+Library Cache
+By Todd Roberts
+https://github.com/toddrob99/searcharr
+"""
+from array import array
+import sys
+from threading import Lock, Thread
+import time
+
+
+class Records(object):
+    # Compact, column-oriented storage for library items, with one column per field.
+    # Integer columns are kept in arrays and strings are interned.
+    __slots__ = ("fields", "_columns", "_rows")
+
+    def __init__(self, fields, items=()):
+        self.fields = list(fields)
+        self._columns = [array("q") for _ in self.fields]
+        self._rows = 0
+        for x in items:
+            self.append(x)
+
+    def __len__(self):
+        return self._rows
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += self._rows
+        if not 0 <= row < self._rows:
+            raise IndexError("record index out of range")
+        return {
+            k: c[row] for k, c in zip(self.fields, self._columns) if c[row] is not None
+        }
+
+    def __iter__(self):
+        for row in range(self._rows):
+            yield self[row]
+
+    def append(self, item):
+        for i, k in enumerate(self.fields):
+            v = item.get(k)
+            c = self._columns[i]
+            if isinstance(c, array):
+                if type(v) is int and -(2**63) <= v < 2**63:
+                    c.append(v)
+                    continue
+                # Fall back to a list once a column holds anything but integers
+                c = self._columns[i] = list(c)
+            c.append(sys.intern(v) if isinstance(v, str) else v)
+        self._rows += 1
+
+    def column(self, field):
+        if field not in self.fields:
+            return [None] * self._rows
+        return self._columns[self.fields.index(field)]
+
+    def find_row(self, id):
+        try:
+            return self.column("id").index(id)
+        except ValueError:
+            return None
+
+    def without(self, id):
+        # Return a copy of the records minus the item with the given id
+        r = Records(self.fields)
+        r._columns = [c[:] for c in self._columns]
+        r._rows = self._rows
+        row = r.find_row(id)
+        if row is not None:
+            for c in r._columns:
+                del c[row]
+            r._rows -= 1
+        return r
+
+
+class Library(object):
+    def __init__(self, name, index_keys, fetch=None, fields=None, ttl=30, logger=None):
+        # fields limits which fields of each item are kept, e.g. from webhook payloads
+        self.name = name
+        self.index_keys = index_keys
+        self.fields = fields
+        self.ttl = ttl
+        self.logger = logger
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.last_refresh_duration = None
+        self._fetch = fetch
+        self._refresh_lock = Lock()
+        self._write_lock = Lock()
+        self._snapshot = {"items": Records(fields or ["id"]), "ts": 0, "index": {}}
+
+    def loaded(self):
+        return self._snapshot["ts"] > 0
+
+    def stale(self):
+        return int(round(self._snapshot["ts"])) < int(round(time.time())) - self.ttl
+
+    def age(self):
+        return time.time() - self._snapshot["ts"] if self.loaded() else None
+
+    def get_all(self):
+        if self._fetch and self.stale():
+            if self.loaded():
+                # Serve the last snapshot while a fresh one is downloaded
+                self.refresh_in_background()
+            else:
+                self.refresh()
+
+        return self._snapshot["items"]
+
+    def refresh(self):
+        with self._refresh_lock:
+            if self.loaded() and not self.stale():
+                # Another thread finished a refresh while we were waiting
+                return
+            self._refresh()
+
+    def refresh_in_background(self):
+        # Only one refresh may be in flight at a time
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+
+        def target():
+            try:
+                self._refresh()
+            except Exception as e:
+                self.refresh_errors += 1
+                if self.logger:
+                    self.logger.error(
+                        f"Error refreshing {self.name} cache in the background: {e}"
+                    )
+            finally:
+                self._refresh_lock.release()
+
+        Thread(target=target, name=f"{self.name}-refresh", daemon=True).start()
+        return True
+
+    def refreshing(self):
+        return self._refresh_lock.locked()
+
+    def _refresh(self):
+        if self.logger:
+            self.logger.debug(f"Refreshing all {self.name} cache...")
+        start = time.monotonic()
+        items = self._fetch()
+        self.load(items, time.monotonic() - start)
+
+    def load(self, items, duration=None):
+        # Swap in a new snapshot along with its external id -> internal id indexes
+        if items is self._snapshot["items"]:
+            # Nothing changed since the last refresh, so the indexes still hold
+            with self._write_lock:
+                self._snapshot = dict(self._snapshot, ts=time.time())
+        else:
+            if not isinstance(items, Records):
+                items = items or []
+                items = Records(
+                    self.fields or list(dict.fromkeys(k for x in items for k in x)),
+                    items,
+                )
+            ids = items.column("id")
+            snapshot = {
+                "items": items,
+                "ts": time.time(),
+                "index": {
+                    k: {ext: i for ext, i in zip(items.column(k), ids) if ext}
+                    for k in self.index_keys
+                },
+            }
+            with self._write_lock:
+                self._snapshot = snapshot
+        self.refreshes += 1
+        self.last_refresh_duration = duration
+        if self.logger and duration is not None:
+            self.logger.debug(
+                f"Refreshed {self.name} cache with {len(items)} items in {duration:.3f}s"
+            )
+
+    def upsert(self, item):
+        # Patch a single item into the snapshot, e.g. from a webhook event
+        with self._write_lock:
+            items = self._snapshot["items"].without(item["id"])
+            items.append(item)
+            index = {}
+            for k in self.index_keys:
+                index[k] = {
+                    ext: i
+                    for ext, i in self._snapshot["index"].get(k, {}).items()
+                    if i != item["id"]
+                }
+                if item.get(k):
+                    index[k][item[k]] = item["id"]
+            self._snapshot = dict(self._snapshot, items=items, index=index)
+
+    def remove(self, id):
+        with self._write_lock:
+            self._snapshot = dict(
+                self._snapshot,
+                items=self._snapshot["items"].without(id),
+                index={
+                    k: {ext: i for ext, i in v.items() if i != id}
+                    for k, v in self._snapshot["index"].items()
+                },
+            )
+
+    def invalidate(self):
+        # Keep serving the current snapshot, but refresh it on next access
+        with self._write_lock:
+            self._snapshot = dict(self._snapshot, ts=min(self._snapshot["ts"], 1))
+
+    def get(self, id):
+        items = self.get_all()
+        row = items.find_row(id)
+        return items[row] if row is not None else None
+
+    def find_id(self, **ids):
+        # Return the internal id of the first external id found in the library
+        self.get_all()
+        index = self._snapshot["index"]
+        return next(
+            (index[k][v] for k, v in ids.items() if v and v in index.get(k, {})),
+            None,
+        )
+
+    def stats(self):
+        age = self.age()
+        return {
+            "items": len(self._snapshot["items"]),
+            "age": round(age, 1) if age is not None else None,
+            "refreshing": self.refreshing(),
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "last_refresh_duration": round(self.last_refresh_duration, 3)
+            if self.last_refresh_duration is not None
+            else None,
+        }
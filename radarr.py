@@ -5,80 +5,79 @@ Radarr API Wrapper
 By Todd Roberts
 https://github.com/toddrob99/searcharr
 """
-import requests
 from urllib.parse import quote
 
-from log import set_up_logger
+from arr import Arr, format_root_folders
 
 
-class Radarr(object):
-    def __init__(self, api_url, api_key, verbose=False):
-        self.logger = set_up_logger("searcharr.radarr", verbose, False)
-        self.logger.debug("Logging started!")
+# Only these fields of each library item are kept in memory
+MOVIE_FIELDS = ["id", "title", "tmdbId", "imdbId"]
+
+
+class Radarr(Arr):
+    app_name = "Radarr"
+    endpoint_timeouts = dict(Arr.endpoint_timeouts, **{"movie": 120})
+
+    def __init__(self, api_url, api_key, verbose=False, **kwargs):
+        super().__init__(verbose, **kwargs)
         if api_url[-1] == "/":
             api_url = api_url[:-1]
         if api_url[:4] != "http":
             self.logger.error(
                 "Invalid Radarr URL detected. Please update your settings to include http:// or https:// on the beginning of the URL."
             )
-        self.radarr_version = self.discover_version(api_url, api_key)
-        if not self.radarr_version.startswith("0."):
-            self.api_url = api_url + "/api/v3/{endpoint}?apikey=" + api_key
-        self._quality_profiles = self.get_all_quality_profiles()
-        self._root_folders = self.get_root_folders()
-
-    def discover_version(self, api_url, api_key):
-        try:
-            self.api_url = api_url + "/api/v3/{endpoint}?apikey=" + api_key
-            radarrInfo = self._api_get("system/status")
-            self.logger.debug(
-                f"Discovered Radarr version {radarrInfo.get('version')}. Using v3 api."
-            )
-            return radarrInfo.get("version")
-        except requests.exceptions.HTTPError as e:
-            self.logger.debug(f"Radarr v3 API threw exception: {e}")
-
-        try:
-            self.api_url = api_url + "/api/{endpoint}?apikey=" + api_key
-            radarrInfo = self._api_get("system/status")
-            self.logger.warning(
-                f"Discovered Radarr version {radarrInfo.get('version')}. Using legacy API. Consider upgrading to the latest version of Radarr for the best experience."
-            )
-            return radarrInfo.get("version")
-        except requests.exceptions.HTTPError as e:
-            self.logger.debug(f"Radarr legacy API threw exception: {e}")
+        self._timed("discover_version", self.discover_version, api_url, api_key)
+        self._all_movies = self._library(
+            "movie", ["tmdbId", "imdbId"], "movie", MOVIE_FIELDS
+        )
+        r = self._bootstrap(
+            quality_profiles=self.get_all_quality_profiles,
+            root_folders=self.get_root_folders,
+            movies=self.get_all_movies,
+        )
+        self._quality_profiles = r["quality_profiles"]
+        self._root_folders = r["root_folders"]
+
+    @property
+    def radarr_version(self):
+        return self.version
 
-        self.logger.debug("Failed to discover Radarr version")
-        return None
+    def _select_api_path(self, version, path):
+        return path if version.startswith("0.") else "/api/v3"
 
     def lookup_movie(self, title=None, tmdb_id=None):
-        r = self._api_get(
-            "movie/lookup", {"term": f"tmdb:{tmdb_id}" if tmdb_id else quote(title)}
-        )
+        term = f"tmdb:{tmdb_id}" if tmdb_id else title
+        return self._cached_lookup(term, lambda: self._lookup_movie(term))
+
+    def _lookup_movie(self, term):
+        r = self._api_get("movie/lookup", {"term": quote(term)})
         if not r:
             return []
 
         return [
-            {
-                "title": x.get("title"),
-                "overview": x.get("overview", "No overview available."),
-                "status": x.get("status", "Unknown Status"),
-                "inCinemas": x.get("inCinemas"),
-                "remotePoster": x.get(
-                    "remotePoster",
-                    "https://artworks.thetvdb.com/banners/images/missing/movie.jpg",
-                ),
-                "year": x.get("year"),
-                "tmdbId": x.get("tmdbId"),
-                "imdbId": x.get("imdbId", None),
-                "runtime": x.get("runtime"),
-                "id": x.get("id"),
-                "titleSlug": x.get("titleSlug"),
-                "images": x.get("images"),
-            }
+            _movie_result(x, self._movie_internal_id(x.get("tmdbId"), x.get("imdbId")))
             for x in r
         ]
 
+    def _movie_internal_id(self, tmdb_id, imdb_id=None):
+        return self._all_movies.find_id(tmdbId=tmdb_id, imdbId=imdb_id)
+
+    def get_all_movies(self):
+        return self._all_movies.get_all()
+
+    def handle_webhook(self, event):
+        event_type = event.get("eventType")
+        self.logger.debug(f"Received {event_type} webhook")
+        if event_type == "MovieAdded":
+            self._all_movies.upsert(event["movie"])
+        elif event_type == "MovieDelete":
+            self._all_movies.remove(event["movie"]["id"])
+        else:
+            return False
+
+        self._invalidate_lookups()
+        return True
+
     def add_movie(
         self,
         movie_info=None,
@@ -98,120 +97,43 @@ class Radarr(object):
             else:
                 return False
 
-        self.logger.debug(f"Additional data: {additional_data}")
+        # Concurrent adds of the same movie share a single request
+        return self._single_flight(
+            ("add", movie_info["tmdbId"]),
+            lambda: self._add_movie(
+                movie_info, search, monitored, min_avail, additional_data
+            ),
+        )
 
-        path = additional_data["p"]
-        quality = int(additional_data["q"])
-        tags = additional_data.get("t", "")
-        if len(tags):
-            tag_ids = [int(x) for x in tags.split(",")]
-        else:
-            tag_ids = []
-
-        params = {
-            "tmdbId": movie_info["tmdbId"],
-            "title": movie_info["title"],
-            "year": movie_info["year"],
-            "qualityProfileId": quality,
-            "titleSlug": movie_info["titleSlug"],
-            "images": movie_info["images"],
-            "rootFolderPath": path,
-            "monitored": monitored,
-            "minimumAvailability": min_avail,
-            "tags": tag_ids,
-            "addOptions": {"searchForMovie": search},
-        }
-
-        return self._api_post("movie", params)
+    def _add_movie(self, movie_info, search, monitored, min_avail, additional_data):
+        id = self._movie_internal_id(movie_info["tmdbId"], movie_info.get("imdbId"))
+        if id:
+            self.logger.info(
+                f"[{movie_info['title']}] is already in {self.name}, so not adding it again"
+            )
+            return self._all_movies.get(id) or {"id": id}
 
-    def get_root_folders(self):
-        r = self._api_get("RootFolder", {})
-        if not r:
-            return []
+        self.logger.debug(f"Additional data: {additional_data}")
 
-        return [
-            {
-                "path": x.get("path"),
-                "freeSpace": x.get("freeSpace"),
-                "totalSpace": x.get("totalSpace"),
-                "id": x.get("id"),
-            }
-            for x in r
-        ]
+        # Searches are batched with other adds' when the scheduler is enabled
+        batched = search and self._searches is not None
+        params = _movie_add_params(
+            movie_info, search and not batched, monitored, min_avail, additional_data
+        )
 
-    def _api_get(self, endpoint, params={}):
-        url = self.api_url.format(endpoint=endpoint)
-        for k, v in params.items():
-            url += f"&{k}={v}"
-        self.logger.debug(f"Submitting GET request: [{url}]")
-        r = requests.get(url)
-        if r.status_code not in [200, 201, 202, 204]:
-            r.raise_for_status()
-            return None
-        else:
-            return r.json()
+        r = self._api_post("movie", params)
+        if r:
+            self._all_movies.upsert(r)
+            self._invalidate_lookups()
+            if batched:
+                self._searches.schedule(r["id"])
+        return r
 
-    def get_all_tags(self):
-        r = self._api_get("tag", {})
-        self.logger.debug(f"Result of API call to get all tags: {r}")
-        return [] if not r else r
+    def _search_command(self, ids):
+        self._api_post("command", {"name": "MoviesSearch", "movieIds": ids})
 
-    def get_filtered_tags(self, allowed_tags, excluded_tags):
-        r = self.get_all_tags()
-        if not r:
-            return []
-        elif allowed_tags == []:
-            return [
-                x
-                for x in r
-                if not x["label"].startswith("searcharr-")
-                and not x["label"] in excluded_tags
-            ]
-        else:
-            return [
-                x
-                for x in r
-                if not x["label"].startswith("searcharr-")
-                and (x["label"] in allowed_tags or x["id"] in allowed_tags)
-                and x["label"] not in excluded_tags
-            ]
-
-    def add_tag(self, tag):
-        params = {
-            "label": tag,
-        }
-        t = self._api_post("tag", params)
-        self.logger.debug(f"Result of API call to add tag: {t}")
-        return t
-
-    def get_tag_id(self, tag):
-        if i := next(
-            iter(
-                [
-                    x.get("id")
-                    for x in self.get_all_tags()
-                    if x.get("label").lower() == tag.lower()
-                ]
-            ),
-            None,
-        ):
-            self.logger.debug(f"Found tag id [{i}] for tag [{tag}]")
-            return i
-        else:
-            self.logger.debug(f"No tag id found for [{tag}]; adding...")
-            t = self.add_tag(tag)
-            if not isinstance(t, dict):
-                self.logger.error(
-                    f"Wrong data type returned from Radarr API when attempting to add tag [{tag}]. Expected dict, got {type(t)}."
-                )
-                return None
-            else:
-                self.logger.debug(
-                    f"Created tag id for tag [{tag}]: {t['id']}"
-                    if t.get("id")
-                    else f"Could not add tag [{tag}]"
-                )
-            return t.get("id", None)
+    def get_root_folders(self):
+        return format_root_folders(self._api_get("RootFolder", {}))
 
     def lookup_quality_profile(self, v):
         # Look up quality profile from a profile name or id
@@ -234,12 +156,46 @@ class Radarr(object):
             None,
         )
 
-    def _api_post(self, endpoint, params={}):
-        url = self.api_url.format(endpoint=endpoint)
-        self.logger.debug(f"Submitting POST request: [{url}]; params: [{params}]")
-        r = requests.post(url, json=params)
-        if r.status_code not in [200, 201, 202, 204]:
-            r.raise_for_status()
-            return None
-        else:
-            return r.json()
+
+def _movie_result(x, internal_id):
+    return {
+        "title": x.get("title"),
+        "overview": x.get("overview", "No overview available."),
+        "status": x.get("status", "Unknown Status"),
+        "inCinemas": x.get("inCinemas"),
+        "remotePoster": x.get(
+            "remotePoster",
+            "https://artworks.thetvdb.com/banners/images/missing/movie.jpg",
+        ),
+        "year": x.get("year"),
+        "tmdbId": x.get("tmdbId"),
+        "imdbId": x.get("imdbId", None),
+        "runtime": x.get("runtime"),
+        "id": x.get("id") or internal_id,
+        "titleSlug": x.get("titleSlug"),
+        "images": x.get("images"),
+    }
+
+
+def _movie_add_params(movie_info, search, monitored, min_avail, additional_data):
+    path = additional_data["p"]
+    quality = int(additional_data["q"])
+    tags = additional_data.get("t", "")
+    if len(tags):
+        tag_ids = [int(x) for x in tags.split(",")]
+    else:
+        tag_ids = []
+
+    return {
+        "tmdbId": movie_info["tmdbId"],
+        "title": movie_info["title"],
+        "year": movie_info["year"],
+        "qualityProfileId": quality,
+        "titleSlug": movie_info["titleSlug"],
+        "images": movie_info["images"],
+        "rootFolderPath": path,
+        "monitored": monitored,
+        "minimumAvailability": min_avail,
+        "tags": tag_ids,
+        "addOptions": {"searchForMovie": search},
+    }
@@ -5,84 +5,84 @@ Readarr API Wrapper
 By Ayman Bagabas
 https://github.com/toddrob99/searcharr
 """
-import requests
 from urllib.parse import quote
 
-from log import set_up_logger
+from arr import Arr, format_root_folders
 
 
-class Readarr(object):
-    def __init__(self, api_url, api_key, verbose=False):
-        self.logger = set_up_logger("searcharr.readarr", verbose, False)
-        self.logger.debug("Logging started!")
+# Only these fields of each library item are kept in memory
+BOOK_FIELDS = ["id", "title", "foreignBookId", "authorId"]
+
+
+class Readarr(Arr):
+    app_name = "Readarr"
+    api_version = "v1"
+    endpoint_timeouts = dict(Arr.endpoint_timeouts, **{"book": 120})
+
+    def __init__(self, api_url, api_key, verbose=False, **kwargs):
+        super().__init__(verbose, **kwargs)
         if api_url[-1] == "/":
             api_url = api_url[:-1]
         if api_url[:4] != "http":
             self.logger.error(
                 "Invalid Readarr URL detected. Please update your settings to include http:// or https:// on the beginning of the URL."
             )
-        self.readarr_version = self.discover_version(api_url, api_key)
-        if not self.readarr_version.startswith("0."):
-            self.api_url = api_url + "/api/v1/{endpoint}?apikey=" + api_key
-        self._quality_profiles = self.get_all_quality_profiles()
-        self._metadata_profiles = self.get_all_metadata_profiles()
-        self._root_folders = self.get_root_folders()
-
-    def discover_version(self, api_url, api_key):
-        try:
-            self.api_url = api_url + "/api/v1/{endpoint}?apikey=" + api_key
-            readarrInfo = self._api_get("system/status")
-            self.logger.debug(
-                f"Discovered Readarr version {readarrInfo.get('version')}. Using v1 api."
-            )
-            return readarrInfo.get("version")
-        except requests.exceptions.HTTPError as e:
-            self.logger.debug(f"Readarr v1 API threw exception: {e}")
-
-        try:
-            self.api_url = api_url + "/api/{endpoint}?apikey=" + api_key
-            readarrInfo = self._api_get("system/status")
-            self.logger.warning(
-                f"Discovered Readarr version {readarrInfo.get('version')}. Using legacy API. Consider upgrading to the latest version of Readarr for the best experience."
-            )
-            return readarrInfo.get("version")
-        except requests.exceptions.HTTPError as e:
-            self.logger.debug(f"Readarr legacy API threw exception: {e}")
+        self._timed("discover_version", self.discover_version, api_url, api_key)
+        self._all_books = self._library("book", ["foreignBookId"], "book", BOOK_FIELDS)
+        r = self._bootstrap(
+            quality_profiles=self.get_all_quality_profiles,
+            metadata_profiles=self.get_all_metadata_profiles,
+            root_folders=self.get_root_folders,
+            books=self.get_all_books,
+        )
+        self._quality_profiles = r["quality_profiles"]
+        self._metadata_profiles = r["metadata_profiles"]
+        self._root_folders = r["root_folders"]
 
-        self.logger.debug("Failed to discover Readarr version")
-        return None
+    @property
+    def readarr_version(self):
+        return self.version
+
+    def _select_api_path(self, version, path):
+        return path if version.startswith("0.") else "/api/v1"
 
     def lookup_book(self, title):
+        return self._cached_lookup(title, lambda: self._lookup_book(title))
+
+    def _lookup_book(self, title):
         r = self._api_get("search", {"term": quote(title)})
         if not r:
             return []
 
         return [
-            {
-                "title": x.get("book").get("title"),
-                "authorId": x.get("book").get("authorId"),
-                "authorTitle": x.get("book").get("authorTitle"),
-                "seriesTitle": x.get("book").get("seriesTitle"),
-                "disambiguation": x.get("book").get("disambiguation"),
-                "overview": x.get("book").get("overview", "No overview available."),
-                "remotePoster": x.get("book").get(
-                    "remoteCover",
-                    "https://artworks.thetvdb.com/banners/images/missing/movie.jpg",
-                ),
-                "releaseDate": x.get("book").get("releaseDate"),
-                "foreignBookId": x.get("book").get("foreignBookId"),
-                "id": x.get("book").get("id"),
-                "pageCount": x.get("book").get("pageCount"),
-                "titleSlug": x.get("book").get("titleSlug"),
-                "images": x.get("book").get("images"),
-                "links": x.get("book").get("links"),
-                "author": x.get("book").get("author"),
-                "editions": x.get("book").get("editions"),
-            }
+            _book_result(
+                x.get("book"),
+                self._book_internal_id(x.get("book").get("foreignBookId")),
+            )
             for x in r
             if x.get("book")
         ]
 
+    def _book_internal_id(self, foreign_book_id):
+        return self._all_books.find_id(foreignBookId=foreign_book_id)
+
+    def get_all_books(self):
+        return self._all_books.get_all()
+
+    def handle_webhook(self, event):
+        event_type = event.get("eventType")
+        self.logger.debug(f"Received {event_type} webhook")
+        if event_type in ["AuthorAdded", "AuthorDelete"]:
+            # The event carries no books, so pick those up on the next access
+            self._all_books.invalidate()
+        elif event_type == "BookDelete":
+            self._all_books.remove(event["book"]["id"])
+        else:
+            return False
+
+        self._invalidate_lookups()
+        return True
+
     def add_book(
         self,
         book_info=None,
@@ -100,134 +100,43 @@ class Readarr(object):
             else:
                 return False
 
+        # Concurrent adds of the same book share a single request
+        return self._single_flight(
+            ("add", book_info["foreignBookId"]),
+            lambda: self._add_book(book_info, search, monitored, additional_data),
+        )
+
+    def _add_book(self, book_info, search, monitored, additional_data):
+        id = self._book_internal_id(book_info["foreignBookId"])
+        if id:
+            self.logger.info(
+                f"[{book_info['title']}] is already in {self.name}, so not adding it again"
+            )
+            return self._all_books.get(id) or {"id": id}
+
         self.logger.debug(f"Additional data: {additional_data}")
 
-        path = additional_data["p"]
-        quality = int(additional_data["q"])
-        metadata = int(additional_data["m"])
-        tags = additional_data.get("t", "")
-        if len(tags):
-            tag_ids = [int(x) for x in tags.split(",")]
-        else:
-            tag_ids = []
-
-        params = {
-            "title": book_info["title"],
-            "releaseDate": book_info["releaseDate"],
-            "foreignBookId": book_info["foreignBookId"],
-            "titleSlug": book_info["titleSlug"],
-            "monitored": monitored,
-            "anyEditionOk": True,
-            "addOptions": {
-                "searchForNewBook": False  # manually searching below instead
-            },
-            "editions": book_info["editions"],
-            "author": {
-                "qualityProfileId": quality,
-                "metadataProfileId": metadata,
-                "foreignAuthorId": book_info["author"]["foreignAuthorId"],
-                "rootFolderPath": path,
-                "tags": tag_ids,
-            },
-        }
+        params = _book_add_params(book_info, monitored, additional_data)
 
         rsp = self._api_post("book", params)
+        if rsp:
+            self._all_books.upsert(rsp)
+            self._invalidate_lookups()
         if rsp is not None and search:
-            # Force book search
-            srsp = self._api_post(
-                "command", {"name": "BookSearch", "bookIds": [rsp.get("id")]}
-            )
-            self.logger.debug(f"Result of attempt to search book: {srsp}")
+            if self._searches:
+                # Searched along with any other books added around the same time
+                self._searches.schedule(rsp.get("id"))
+            else:
+                # Force book search
+                self._search_command([rsp.get("id")])
         return rsp
 
-    def get_root_folders(self):
-        r = self._api_get("rootfolder", {})
-        if not r:
-            return []
-
-        return [
-            {
-                "path": x.get("path"),
-                "freeSpace": x.get("freeSpace"),
-                "totalSpace": x.get("totalSpace"),
-                "id": x.get("id"),
-            }
-            for x in r
-        ]
-
-    def _api_get(self, endpoint, params={}):
-        url = self.api_url.format(endpoint=endpoint)
-        for k, v in params.items():
-            url += f"&{k}={v}"
-        self.logger.debug(f"Submitting GET request: [{url}]")
-        r = requests.get(url)
-        if r.status_code not in [200, 201, 202, 204]:
-            r.raise_for_status()
-            return None
-        else:
-            return r.json()
-
-    def get_all_tags(self):
-        r = self._api_get("tag", {})
-        self.logger.debug(f"Result of API call to get all tags: {r}")
-        return [] if not r else r
+    def _search_command(self, ids):
+        srsp = self._api_post("command", {"name": "BookSearch", "bookIds": ids})
+        self.logger.debug(f"Result of attempt to search books: {srsp}")
 
-    def get_filtered_tags(self, allowed_tags, excluded_tags):
-        r = self.get_all_tags()
-        if not r:
-            return []
-        elif allowed_tags == []:
-            return [
-                x
-                for x in r
-                if not x["label"].startswith("searcharr-")
-                and not x["label"] in excluded_tags
-            ]
-        else:
-            return [
-                x
-                for x in r
-                if not x["label"].startswith("searcharr-")
-                and (x["label"] in allowed_tags or x["id"] in allowed_tags)
-                and x["label"] not in excluded_tags
-            ]
-
-    def add_tag(self, tag):
-        params = {
-            "label": tag,
-        }
-        t = self._api_post("tag", params)
-        self.logger.debug(f"Result of API call to add tag: {t}")
-        return t
-
-    def get_tag_id(self, tag):
-        if i := next(
-            iter(
-                [
-                    x.get("id")
-                    for x in self.get_all_tags()
-                    if x.get("label").lower() == tag.lower()
-                ]
-            ),
-            None,
-        ):
-            self.logger.debug(f"Found tag id [{i}] for tag [{tag}]")
-            return i
-        else:
-            self.logger.debug(f"No tag id found for [{tag}]; adding...")
-            t = self.add_tag(tag)
-            if not isinstance(t, dict):
-                self.logger.error(
-                    f"Wrong data type returned from Readarr API when attempting to add tag [{tag}]. Expected dict, got {type(t)}."
-                )
-                return None
-            else:
-                self.logger.debug(
-                    f"Created tag id for tag [{tag}]: {t['id']}"
-                    if t.get("id")
-                    else f"Could not add tag [{tag}]"
-                )
-            return t.get("id", None)
+    def get_root_folders(self):
+        return format_root_folders(self._api_get("rootfolder", {}))
 
     def lookup_quality_profile(self, v):
         # Look up quality profile from a profile name or id
@@ -256,12 +165,55 @@ class Readarr(object):
             None,
         )
 
-    def _api_post(self, endpoint, params={}):
-        url = self.api_url.format(endpoint=endpoint)
-        self.logger.debug(f"Submitting POST request: [{url}]; params: [{params}]")
-        r = requests.post(url, json=params)
-        if r.status_code not in [200, 201, 202, 204]:
-            r.raise_for_status()
-            return None
-        else:
-            return r.json()
+
+def _book_result(b, internal_id):
+    return {
+        "title": b.get("title"),
+        "authorId": b.get("authorId"),
+        "authorTitle": b.get("authorTitle"),
+        "seriesTitle": b.get("seriesTitle"),
+        "disambiguation": b.get("disambiguation"),
+        "overview": b.get("overview", "No overview available."),
+        "remotePoster": b.get(
+            "remoteCover",
+            "https://artworks.thetvdb.com/banners/images/missing/movie.jpg",
+        ),
+        "releaseDate": b.get("releaseDate"),
+        "foreignBookId": b.get("foreignBookId"),
+        "id": b.get("id") or internal_id,
+        "pageCount": b.get("pageCount"),
+        "titleSlug": b.get("titleSlug"),
+        "images": b.get("images"),
+        "links": b.get("links"),
+        "author": b.get("author"),
+        "editions": b.get("editions"),
+    }
+
+
+def _book_add_params(book_info, monitored, additional_data):
+    path = additional_data["p"]
+    quality = int(additional_data["q"])
+    metadata = int(additional_data["m"])
+    tags = additional_data.get("t", "")
+    if len(tags):
+        tag_ids = [int(x) for x in tags.split(",")]
+    else:
+        tag_ids = []
+
+    return {
+        "title": book_info["title"],
+        "releaseDate": book_info["releaseDate"],
+        "foreignBookId": book_info["foreignBookId"],
+        "titleSlug": book_info["titleSlug"],
+        "monitored": monitored,
+        "anyEditionOk": True,
+        "addOptions": {"searchForNewBook": False},  # manually searching below instead
+        "editions": book_info["editions"],
+        "author": {
+            "qualityProfileId": quality,
+            "metadataProfileId": metadata,
+            "foreignAuthorId": book_info["author"]["foreignAuthorId"],
+            "rootFolderPath": path,
+            "tags": tag_ids,
+        },
+    }
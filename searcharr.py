@@ -5,30 +5,38 @@ By Todd Roberts
 https://github.com/toddrob99/searcharr
 """
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 import json
 import os
 import yaml
 import sqlite3
-from threading import Lock
+from threading import local, Lock
+import time
 from urllib.parse import parse_qsl
 import uuid
 from datetime import datetime
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
-from telegram.error import BadRequest
+from telegram.error import BadRequest, TelegramError
 from telegram.ext import Updater, CommandHandler, CallbackQueryHandler
 
 from log import set_up_logger
+import arr
+import cache
+import jobs
 import radarr
 import sonarr
 import readarr
 import settings
+import webhook
 
 __version__ = "3.2.2"
 
 DBPATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data")
 DBFILE = "searcharr.db"
-DBLOCK = Lock()
+# Per-app permission bits, precomputed from the users.permissions column
+PERMISSIONS = {"sonarr": 1, "radarr": 2, "readarr": 4}
+ALL_PERMISSIONS = 7
 
 
 def parse_args():
@@ -59,46 +67,227 @@ def parse_args():
     return parser.parse_args()
 
 
+class ConversationResults(object):
+    # The results of a conversation, each read from the database only when it is shown
+    def __init__(self, count, fetch):
+        self._count = count
+        self._fetch = fetch
+        self._results = {}
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(self._count))]
+        if idx < 0:
+            idx += self._count
+        if not 0 <= idx < self._count:
+            raise IndexError("result index out of range")
+        if idx not in self._results:
+            self._results[idx] = self._fetch(idx)
+        return self._results[idx]
+
+    def __iter__(self):
+        for idx in range(self._count):
+            yield self[idx]
+
+
 class Searcharr(object):
     def __init__(self, token):
         self.DEV_MODE = True if args.dev_mode else False
         self.token = token
+        # Each thread keeps its own database connection open
+        self._db = local()
+        # Users and their permissions are read from memory, and written through to the database
+        self._users = None
+        self._users_lock = Lock()
         logger.info(f"Searcharr v{__version__} - Logging started!")
         self._lang = self._load_language()
         if self._lang.get("language_ietf") != "en-us":
             self._lang_default = self._load_language("en-us")
-        self.sonarr = (
-            sonarr.Sonarr(settings.sonarr_url, settings.sonarr_api_key, args.verbose)
-            if settings.sonarr_enabled
+        if not hasattr(settings, "searcharr_arr_pool_size"):
+            settings.searcharr_arr_pool_size = 10
+            logger.warning(
+                "No searcharr_arr_pool_size setting found. Please add searcharr_arr_pool_size to settings.py (e.g. searcharr_arr_pool_size=10) to control how many connections are kept open to each of Sonarr/Radarr/Readarr. Defaulting to 10."
+            )
+        if not hasattr(settings, "searcharr_arr_connect_timeout"):
+            settings.searcharr_arr_connect_timeout = 5
+            logger.warning(
+                "No searcharr_arr_connect_timeout setting found. Please add searcharr_arr_connect_timeout to settings.py (e.g. searcharr_arr_connect_timeout=5). Defaulting to 5 seconds."
+            )
+        if not hasattr(settings, "searcharr_arr_read_timeout"):
+            settings.searcharr_arr_read_timeout = 30
+            logger.warning(
+                "No searcharr_arr_read_timeout setting found. Please add searcharr_arr_read_timeout to settings.py (e.g. searcharr_arr_read_timeout=30). Defaulting to 30 seconds."
+            )
+        if not hasattr(settings, "searcharr_arr_dns_cache_ttl"):
+            settings.searcharr_arr_dns_cache_ttl = 300
+            logger.warning(
+                "No searcharr_arr_dns_cache_ttl setting found. Please add searcharr_arr_dns_cache_ttl to settings.py (e.g. searcharr_arr_dns_cache_ttl=300, or 0 to disable DNS caching). Defaulting to 300 seconds."
+            )
+        if not hasattr(settings, "searcharr_arr_version_cache_ttl"):
+            settings.searcharr_arr_version_cache_ttl = 86400
+            logger.warning(
+                "No searcharr_arr_version_cache_ttl setting found. Please add searcharr_arr_version_cache_ttl to settings.py (e.g. searcharr_arr_version_cache_ttl=86400, or 0 to probe the API version on every start). Defaulting to 86400 seconds."
+            )
+        if not hasattr(settings, "searcharr_arr_retries"):
+            settings.searcharr_arr_retries = 2
+            logger.warning(
+                "No searcharr_arr_retries setting found. Please add searcharr_arr_retries to settings.py (e.g. searcharr_arr_retries=2, or 0 to disable retries). Defaulting to 2."
+            )
+        if not hasattr(settings, "searcharr_arr_breaker_threshold"):
+            settings.searcharr_arr_breaker_threshold = 5
+            logger.warning(
+                "No searcharr_arr_breaker_threshold setting found. Please add searcharr_arr_breaker_threshold to settings.py (e.g. searcharr_arr_breaker_threshold=5). Defaulting to 5 consecutive failures."
+            )
+        if not hasattr(settings, "searcharr_arr_breaker_reset"):
+            settings.searcharr_arr_breaker_reset = 30
+            logger.warning(
+                "No searcharr_arr_breaker_reset setting found. Please add searcharr_arr_breaker_reset to settings.py (e.g. searcharr_arr_breaker_reset=30). Defaulting to 30 seconds."
+            )
+        if not hasattr(settings, "searcharr_arr_max_concurrency"):
+            settings.searcharr_arr_max_concurrency = 10
+            logger.warning(
+                "No searcharr_arr_max_concurrency setting found. Please add searcharr_arr_max_concurrency to settings.py (e.g. searcharr_arr_max_concurrency=10). Defaulting to 10 concurrent requests per app."
+            )
+        if not hasattr(settings, "searcharr_search_batch_window"):
+            settings.searcharr_search_batch_window = 10
+            logger.warning(
+                "No searcharr_search_batch_window setting found. Please add searcharr_search_batch_window to settings.py (e.g. searcharr_search_batch_window=10, or 0 to search as soon as each item is added). Defaulting to 10 seconds."
+            )
+        if not hasattr(settings, "searcharr_search_off_peak"):
+            settings.searcharr_search_off_peak = []
+            logger.warning(
+                "No searcharr_search_off_peak setting found. Please add searcharr_search_off_peak to settings.py (e.g. searcharr_search_off_peak=[1, 6]) if you want searches for added items to wait until between those hours. Defaulting to empty list ([]), which searches right away."
+            )
+        if not hasattr(settings, "searcharr_lookup_cache_ttl"):
+            settings.searcharr_lookup_cache_ttl = 300
+            logger.warning(
+                "No searcharr_lookup_cache_ttl setting found. Please add searcharr_lookup_cache_ttl to settings.py (e.g. searcharr_lookup_cache_ttl=300, or 0 to disable the lookup cache). Defaulting to 300 seconds."
+            )
+        if not hasattr(settings, "searcharr_lookup_cache_size"):
+            settings.searcharr_lookup_cache_size = 256
+            logger.warning(
+                "No searcharr_lookup_cache_size setting found. Please add searcharr_lookup_cache_size to settings.py (e.g. searcharr_lookup_cache_size=256). Defaulting to 256."
+            )
+        if not hasattr(settings, "searcharr_lookup_cache_persist"):
+            settings.searcharr_lookup_cache_persist = False
+            logger.warning(
+                "No searcharr_lookup_cache_persist setting found. Please add searcharr_lookup_cache_persist to settings.py (e.g. searcharr_lookup_cache_persist=True) if you want cached searches to survive a restart. Defaulting to False."
+            )
+        self._lookup_cache = (
+            cache.LookupCache(
+                ttl=settings.searcharr_lookup_cache_ttl,
+                max_size=settings.searcharr_lookup_cache_size,
+                persist=settings.searcharr_lookup_cache_persist,
+                logger=logger,
+            )
+            if settings.searcharr_lookup_cache_ttl
             else None
         )
-        if self.sonarr:
+        self._arr_options = {
+            "pool_size": settings.searcharr_arr_pool_size,
+            "connect_timeout": settings.searcharr_arr_connect_timeout,
+            "read_timeout": settings.searcharr_arr_read_timeout,
+            "dns_cache_ttl": settings.searcharr_arr_dns_cache_ttl,
+            "version_cache_ttl": settings.searcharr_arr_version_cache_ttl,
+            "retries": settings.searcharr_arr_retries,
+            "breaker_threshold": settings.searcharr_arr_breaker_threshold,
+            "breaker_reset": settings.searcharr_arr_breaker_reset,
+            "max_concurrency": settings.searcharr_arr_max_concurrency,
+            "search_batch_window": settings.searcharr_search_batch_window,
+            "search_off_peak": settings.searcharr_search_off_peak or None,
+            "lookup_cache": self._lookup_cache,
+        }
+        if not hasattr(settings, "searcharr_add_workers"):
+            settings.searcharr_add_workers = 2
+            logger.warning(
+                "No searcharr_add_workers setting found. Please add searcharr_add_workers to settings.py (e.g. searcharr_add_workers=2). Defaulting to 2 background workers for adds."
+            )
+        if not hasattr(settings, "searcharr_conversation_ttl"):
+            settings.searcharr_conversation_ttl = 86400
+            logger.warning(
+                "No searcharr_conversation_ttl setting found. Please add searcharr_conversation_ttl to settings.py (e.g. searcharr_conversation_ttl=86400, or 0 to keep conversations until they are finished). Defaulting to 86400 seconds (1 day)."
+            )
+        if not hasattr(settings, "searcharr_conversation_sweep_interval"):
+            settings.searcharr_conversation_sweep_interval = 3600
+            logger.warning(
+                "No searcharr_conversation_sweep_interval setting found. Please add searcharr_conversation_sweep_interval to settings.py (e.g. searcharr_conversation_sweep_interval=3600). Defaulting to 3600 seconds (1 hour)."
+            )
+        if not hasattr(settings, "searcharr_stale_message_action"):
+            settings.searcharr_stale_message_action = "strip"
+            logger.warning(
+                'No searcharr_stale_message_action setting found. Please add searcharr_stale_message_action to settings.py (e.g. searcharr_stale_message_action="strip" to remove the buttons from messages for expired conversations, "delete" to delete the messages, or "keep" to leave them alone). Defaulting to strip.'
+            )
+        if not hasattr(settings, "readarr_enabled"):
+            settings.readarr_enabled = False
+            logger.warning(
+                "No readarr_enabled setting found. If you want Searcharr to support Readarr, please refer to the sample settings on github and add settings for Readarr to settings.py."
+            )
+        if not hasattr(settings, "sonarr_instance_name"):
+            settings.sonarr_instance_name = "Sonarr"
+            logger.warning(
+                'No sonarr_instance_name setting found. Please add sonarr_instance_name to settings.py (e.g. sonarr_instance_name="Sonarr") if you want to name your Sonarr instance. Defaulting to "Sonarr".'
+            )
+        if not hasattr(settings, "sonarr_instances"):
+            settings.sonarr_instances = []
+            logger.warning(
+                'No sonarr_instances setting found. Please add sonarr_instances to settings.py (e.g. sonarr_instances=[{"name": "Sonarr 4K", "url": "http://127.0.0.1:8990", "api_key": "abc123", "series_paths": ["/path/1"]}]) if you want to search more Sonarr instances. Defaulting to empty list ([]).'
+            )
+        if not hasattr(settings, "radarr_instance_name"):
+            settings.radarr_instance_name = "Radarr"
+            logger.warning(
+                'No radarr_instance_name setting found. Please add radarr_instance_name to settings.py (e.g. radarr_instance_name="Radarr") if you want to name your Radarr instance. Defaulting to "Radarr".'
+            )
+        if not hasattr(settings, "radarr_instances"):
+            settings.radarr_instances = []
+            logger.warning(
+                'No radarr_instances setting found. Please add radarr_instances to settings.py (e.g. radarr_instances=[{"name": "Radarr 4K", "url": "http://127.0.0.1:8990", "api_key": "abc123", "movie_paths": ["/path/1"]}]) if you want to search more Radarr instances. Defaulting to empty list ([]).'
+            )
+        instances = {x: self._instances(x) for x in ["sonarr", "radarr", "readarr"]}
+        self.sonarrs, self.radarrs, readarrs = self._start_backends(
+            [
+                (sonarr.Sonarr, instances["sonarr"]),
+                (radarr.Radarr, instances["radarr"]),
+                (readarr.Readarr, instances["readarr"]),
+            ]
+        )
+        # The default instance of each app
+        self.sonarr = self.sonarrs[0] if self.sonarrs else None
+        self.radarr = self.radarrs[0] if self.radarrs else None
+        self.readarr = readarrs[0] if readarrs else None
+        for backend, instance in zip(self.sonarrs, instances["sonarr"]):
             quality_profiles = []
-            if not isinstance(settings.sonarr_quality_profile_id, list):
-                settings.sonarr_quality_profile_id = [
-                    settings.sonarr_quality_profile_id
-                ]
-            for i in settings.sonarr_quality_profile_id:
+            # Instances can override the app's quality profiles and root folders
+            quality_profile_ids = instance.get(
+                "quality_profile_id", settings.sonarr_quality_profile_id
+            )
+            if not isinstance(quality_profile_ids, list):
+                quality_profile_ids = [quality_profile_ids]
+            for i in quality_profile_ids:
                 logger.debug(
-                    f"Looking up/validating Sonarr quality profile id for [{i}]..."
+                    f"Looking up/validating {backend.name} quality profile id for [{i}]..."
                 )
-                foundProfile = self.sonarr.lookup_quality_profile(i)
+                foundProfile = backend.lookup_quality_profile(i)
                 if not foundProfile:
-                    logger.error(f"Sonarr quality profile id/name [{i}] is invalid!")
+                    logger.error(
+                        f"{backend.name} quality profile id/name [{i}] is invalid!"
+                    )
                 else:
                     logger.debug(
-                        f"Found Sonarr quality profile for [{i}]: [{foundProfile}]"
+                        f"Found {backend.name} quality profile for [{i}]: [{foundProfile}]"
                     )
                     quality_profiles.append(foundProfile)
             if not len(quality_profiles):
                 logger.warning(
-                    f"No valid Sonarr quality profile(s) provided! Using all of the quality profiles I found in Sonarr: {self.sonarr._quality_profiles}"
+                    f"No valid {backend.name} quality profile(s) provided! Using all of the quality profiles I found in {backend.name}: {backend._quality_profiles}"
                 )
             else:
                 logger.debug(
-                    f"Using the following Sonarr quality profile(s): {[(x['id'], x['name']) for x in quality_profiles]}"
+                    f"Using the following {backend.name} quality profile(s): {[(x['id'], x['name']) for x in quality_profiles]}"
                 )
-                self.sonarr._quality_profiles = quality_profiles
+                backend._quality_profiles = quality_profiles
 
             root_folders = []
             if not hasattr(settings, "sonarr_series_paths"):
@@ -106,25 +295,34 @@ class Searcharr(object):
                 logger.warning(
                     'No sonarr_series_paths setting detected. Please set one in settings.py (sonarr_series_paths=["/path/1", "/path/2"]). Proceeding with all root folders configured in Sonarr.'
                 )
-            if not isinstance(settings.sonarr_series_paths, list):
-                settings.sonarr_series_paths = [settings.sonarr_series_paths]
-            for i in settings.sonarr_series_paths:
-                logger.debug(f"Looking up/validating Sonarr root folder for [{i}]...")
-                foundPath = self.sonarr.lookup_root_folder(i)
+            root_folder_paths = instance.get(
+                "series_paths", settings.sonarr_series_paths
+            )
+            if not isinstance(root_folder_paths, list):
+                root_folder_paths = [root_folder_paths]
+            for i in root_folder_paths:
+                logger.debug(
+                    f"Looking up/validating {backend.name} root folder for [{i}]..."
+                )
+                foundPath = backend.lookup_root_folder(i)
                 if not foundPath:
-                    logger.error(f"Sonarr root folder path/id [{i}] is invalid!")
+                    logger.error(
+                        f"{backend.name} root folder path/id [{i}] is invalid!"
+                    )
                 else:
-                    logger.debug(f"Found Sonarr root folder for [{i}]: [{foundPath}]")
+                    logger.debug(
+                        f"Found {backend.name} root folder for [{i}]: [{foundPath}]"
+                    )
                     root_folders.append(foundPath)
             if not len(root_folders):
                 logger.warning(
-                    f"No valid Sonarr root folder(s) provided! Using all of the root folders I found in Sonarr: {self.sonarr._root_folders}"
+                    f"No valid {backend.name} root folder(s) provided! Using all of the root folders I found in {backend.name}: {backend._root_folders}"
                 )
             else:
                 logger.debug(
-                    f"Using the following Sonarr root folder(s): {[(x['id'], x['path']) for x in root_folders]}"
+                    f"Using the following {backend.name} root folder(s): {[(x['id'], x['path']) for x in root_folders]}"
                 )
-                self.sonarr._root_folders = root_folders
+                backend._root_folders = root_folders
             if not hasattr(settings, "sonarr_tag_with_username"):
                 settings.sonarr_tag_with_username = True
                 logger.warning(
@@ -155,46 +353,47 @@ class Searcharr(object):
                 logger.warning(
                     'No sonarr_user_selectable_tags setting found. Please add sonarr_user_selectable_tags to settings.py (e.g. sonarr_user_selectable_tags=["tag-1", "tag-2"]) if you want to limit the tags a user can select. Defaulting to empty list ([]), which will present the user with all tags.'
                 )
-            for t in settings.sonarr_user_selectable_tags:
-                if t_id := self.sonarr.get_tag_id(t):
+            for t, t_id in backend.ensure_tags(
+                settings.sonarr_user_selectable_tags
+            ).items():
+                if t_id:
                     logger.debug(
                         f"Tag id [{t_id}] for user-selectable Sonarr tag [{t}]"
                     )
-            for t in settings.sonarr_forced_tags:
-                if t_id := self.sonarr.get_tag_id(t):
+            for t, t_id in backend.ensure_tags(settings.sonarr_forced_tags).items():
+                if t_id:
                     logger.debug(f"Tag id [{t_id}] for forced Sonarr tag [{t}]")
-        self.radarr = (
-            radarr.Radarr(settings.radarr_url, settings.radarr_api_key, args.verbose)
-            if settings.radarr_enabled
-            else None
-        )
-        if self.radarr:
+        for backend, instance in zip(self.radarrs, instances["radarr"]):
             quality_profiles = []
-            if not isinstance(settings.radarr_quality_profile_id, list):
-                settings.radarr_quality_profile_id = [
-                    settings.radarr_quality_profile_id
-                ]
-            for i in settings.radarr_quality_profile_id:
+            # Instances can override the app's quality profiles and root folders
+            quality_profile_ids = instance.get(
+                "quality_profile_id", settings.radarr_quality_profile_id
+            )
+            if not isinstance(quality_profile_ids, list):
+                quality_profile_ids = [quality_profile_ids]
+            for i in quality_profile_ids:
                 logger.debug(
-                    f"Looking up/validating Radarr quality profile id for [{i}]..."
+                    f"Looking up/validating {backend.name} quality profile id for [{i}]..."
                 )
-                foundProfile = self.radarr.lookup_quality_profile(i)
+                foundProfile = backend.lookup_quality_profile(i)
                 if not foundProfile:
-                    logger.error(f"Radarr quality profile id/name [{i}] is invalid!")
+                    logger.error(
+                        f"{backend.name} quality profile id/name [{i}] is invalid!"
+                    )
                 else:
                     logger.debug(
-                        f"Found Radarr quality profile for [{i}]: [{foundProfile}]"
+                        f"Found {backend.name} quality profile for [{i}]: [{foundProfile}]"
                     )
                     quality_profiles.append(foundProfile)
             if not len(quality_profiles):
                 logger.warning(
-                    f"No valid Radarr quality profile(s) provided! Using all of the quality profiles I found in Radarr: {self.radarr._quality_profiles}"
+                    f"No valid {backend.name} quality profile(s) provided! Using all of the quality profiles I found in {backend.name}: {backend._quality_profiles}"
                 )
             else:
                 logger.debug(
-                    f"Using the following Radarr quality profile(s): {[(x['id'], x['name']) for x in quality_profiles]}"
+                    f"Using the following {backend.name} quality profile(s): {[(x['id'], x['name']) for x in quality_profiles]}"
                 )
-                self.radarr._quality_profiles = quality_profiles
+                backend._quality_profiles = quality_profiles
 
             root_folders = []
             if not hasattr(settings, "radarr_movie_paths"):
@@ -202,25 +401,32 @@ class Searcharr(object):
                 logger.warning(
                     'No radarr_movie_paths setting detected. Please set one in settings.py (radarr_movie_paths=["/path/1", "/path/2"]). Proceeding with all root folders configured in Radarr.'
                 )
-            if not isinstance(settings.radarr_movie_paths, list):
-                settings.radarr_movie_paths = [settings.radarr_movie_paths]
-            for i in settings.radarr_movie_paths:
-                logger.debug(f"Looking up/validating Radarr root folder for [{i}]...")
-                foundPath = self.radarr.lookup_root_folder(i)
+            root_folder_paths = instance.get("movie_paths", settings.radarr_movie_paths)
+            if not isinstance(root_folder_paths, list):
+                root_folder_paths = [root_folder_paths]
+            for i in root_folder_paths:
+                logger.debug(
+                    f"Looking up/validating {backend.name} root folder for [{i}]..."
+                )
+                foundPath = backend.lookup_root_folder(i)
                 if not foundPath:
-                    logger.error(f"Radarr root folder path/id [{i}] is invalid!")
+                    logger.error(
+                        f"{backend.name} root folder path/id [{i}] is invalid!"
+                    )
                 else:
-                    logger.debug(f"Found Radarr root folder for [{i}]: [{foundPath}]")
+                    logger.debug(
+                        f"Found {backend.name} root folder for [{i}]: [{foundPath}]"
+                    )
                     root_folders.append(foundPath)
             if not len(root_folders):
                 logger.warning(
-                    f"No valid Radarr root folder(s) provided! Using all of the root folders I found in Radarr: {self.radarr._root_folders}"
+                    f"No valid {backend.name} root folder(s) provided! Using all of the root folders I found in {backend.name}: {backend._root_folders}"
                 )
             else:
                 logger.debug(
-                    f"Using the following Radarr root folder(s): {[(x['id'], x['path']) for x in root_folders]}"
+                    f"Using the following {backend.name} root folder(s): {[(x['id'], x['path']) for x in root_folders]}"
                 )
-                self.radarr._root_folders = root_folders
+                backend._root_folders = root_folders
             if not hasattr(settings, "radarr_tag_with_username"):
                 settings.radarr_tag_with_username = True
                 logger.warning(
@@ -251,28 +457,16 @@ class Searcharr(object):
                 logger.warning(
                     'No radarr_user_selectable_tags setting found. Please add radarr_user_selectable_tags to settings.py (e.g. radarr_user_selectable_tags=["tag-1", "tag-2"]) if you want to limit the tags a user can select. Defaulting to empty list ([]), which will present the user with all tags.'
                 )
-            for t in settings.radarr_user_selectable_tags:
-                if t_id := self.radarr.get_tag_id(t):
+            for t, t_id in backend.ensure_tags(
+                settings.radarr_user_selectable_tags
+            ).items():
+                if t_id:
                     logger.debug(
                         f"Tag id [{t_id}] for user-selectable Radarr tag [{t}]"
                     )
-            for t in settings.radarr_forced_tags:
-                if t_id := self.radarr.get_tag_id(t):
+            for t, t_id in backend.ensure_tags(settings.radarr_forced_tags).items():
+                if t_id:
                     logger.debug(f"Tag id [{t_id}] for forced Radarr tag [{t}]")
-        if hasattr(settings, "readarr_enabled"):
-            self.readarr = (
-                readarr.Readarr(
-                    settings.readarr_url, settings.readarr_api_key, args.verbose
-                )
-                if settings.readarr_enabled
-                else None
-            )
-        else:
-            settings.readarr_enabled = False
-            self.readarr = None
-            logger.warning(
-                "No readarr_enabled setting found. If you want Searcharr to support Readarr, please refer to the sample settings on github and add settings for Readarr to settings.py."
-            )
         if self.readarr:
             quality_profiles = []
             if not isinstance(settings.readarr_quality_profile_id, list):
@@ -377,13 +571,17 @@ class Searcharr(object):
                 logger.warning(
                     'No readarr_user_selectable_tags setting found. Please add readarr_user_selectable_tags to settings.py (e.g. readarr_user_selectable_tags=["tag-1", "tag-2"]) if you want to limit the tags a user can select. Defaulting to empty list ([]), which will present the user with all tags.'
                 )
-            for t in settings.readarr_user_selectable_tags:
-                if t_id := self.readarr.get_tag_id(t):
+            for t, t_id in self.readarr.ensure_tags(
+                settings.readarr_user_selectable_tags
+            ).items():
+                if t_id:
                     logger.debug(
                         f"Tag id [{t_id}] for user-selectable Readarr tag [{t}]"
                     )
-            for t in settings.readarr_forced_tags:
-                if t_id := self.readarr.get_tag_id(t):
+            for t, t_id in self.readarr.ensure_tags(
+                settings.readarr_forced_tags
+            ).items():
+                if t_id:
                     logger.debug(f"Tag id [{t_id}] for forced Readarr tag [{t}]")
 
         self.conversations = {}
@@ -411,6 +609,37 @@ class Searcharr(object):
             logger.warning(
                 'No searcharr_users_command_aliases setting found. Please add searcharr_users_command_aliases to settings.py (e.g. searcharr_users_command_aliases=["users"]. Defaulting to ["users"].'
             )
+        if not hasattr(settings, "searcharr_status_command_aliases"):
+            settings.searcharr_status_command_aliases = ["status"]
+            logger.warning(
+                'No searcharr_status_command_aliases setting found. Please add searcharr_status_command_aliases to settings.py (e.g. searcharr_status_command_aliases=["status"]. Defaulting to ["status"].'
+            )
+        if not hasattr(settings, "searcharr_webhook_enabled"):
+            settings.searcharr_webhook_enabled = False
+            logger.warning(
+                "No searcharr_webhook_enabled setting found. Please add searcharr_webhook_enabled to settings.py (e.g. searcharr_webhook_enabled=True) if you want Sonarr/Radarr/Readarr webhooks to keep Searcharr up to date. Defaulting to False."
+            )
+        if settings.searcharr_webhook_enabled:
+            if not hasattr(settings, "searcharr_webhook_host"):
+                settings.searcharr_webhook_host = "127.0.0.1"
+                logger.warning(
+                    'No searcharr_webhook_host setting found. Please add searcharr_webhook_host to settings.py (e.g. searcharr_webhook_host="0.0.0.0" to accept webhooks from other hosts, which requires searcharr_webhook_password). Defaulting to "127.0.0.1".'
+                )
+            if not hasattr(settings, "searcharr_webhook_port"):
+                settings.searcharr_webhook_port = 5059
+                logger.warning(
+                    "No searcharr_webhook_port setting found. Please add searcharr_webhook_port to settings.py (e.g. searcharr_webhook_port=5059). Defaulting to 5059."
+                )
+            if not hasattr(settings, "searcharr_webhook_password"):
+                settings.searcharr_webhook_password = ""
+                logger.warning(
+                    'No searcharr_webhook_password setting found. Please add searcharr_webhook_password to settings.py (e.g. searcharr_webhook_password="your webhook password") if you want webhooks to require a password. Defaulting to no password.'
+                )
+            if not hasattr(settings, "searcharr_webhook_sweep_interval"):
+                settings.searcharr_webhook_sweep_interval = 900
+                logger.warning(
+                    "No searcharr_webhook_sweep_interval setting found. Please add searcharr_webhook_sweep_interval to settings.py (e.g. searcharr_webhook_sweep_interval=900). Defaulting to 900 seconds."
+                )
 
     def cmd_start(self, update, context):
         logger.debug(f"Received start cmd from [{update.message.from_user.username}]")
@@ -487,7 +716,14 @@ class Searcharr(object):
                 )
             )
             return
-        results = self.readarr.lookup_book(title)
+        try:
+            results = self.readarr.lookup_book(title)
+        except arr.BackendUnavailable as e:
+            logger.error(f"Error looking up {title}: {e}")
+            update.message.reply_text(
+                self._xlate("backend_unavailable", app=e.app_name)
+            )
+            return
         cid = self._generate_cid()
         # self.conversations.update({cid: {"cid": cid, "type": "book", "results": results}})
         self._create_conversation(
@@ -505,7 +741,7 @@ class Searcharr(object):
                 "book", r, cid, 0, len(results)
             )
             try:
-                context.bot.sendPhoto(
+                message = context.bot.sendPhoto(
                     chat_id=update.message.chat.id,
                     photo=r["remotePoster"],
                     caption=reply_message,
@@ -516,7 +752,7 @@ class Searcharr(object):
                     logger.error(
                         f"Error sending photo [{r['remotePoster']}]: BadRequest: {e}. Attempting to send with default poster..."
                     )
-                    context.bot.sendPhoto(
+                    message = context.bot.sendPhoto(
                         chat_id=update.message.chat.id,
                         photo="https://artworks.thetvdb.com/banners/images/missing/movie.jpg",
                         caption=reply_message,
@@ -524,6 +760,7 @@ class Searcharr(object):
                     )
                 else:
                     raise
+            self._touch_conversation(cid, message)
 
     def cmd_movie(self, update, context):
         logger.debug(f"Received movie cmd from [{update.message.from_user.username}]")
@@ -558,7 +795,16 @@ class Searcharr(object):
                 )
             )
             return
-        results = self.radarr.lookup_movie(title)
+        try:
+            results = self._search(
+                self.radarrs, lambda x: x.lookup_movie(title), "tmdbId"
+            )
+        except arr.BackendUnavailable as e:
+            logger.error(f"Error looking up {title}: {e}")
+            update.message.reply_text(
+                self._xlate("backend_unavailable", app=e.app_name)
+            )
+            return
         cid = self._generate_cid()
         # self.conversations.update({cid: {"cid": cid, "type": "movie", "results": results}})
         self._create_conversation(
@@ -576,7 +822,7 @@ class Searcharr(object):
                 "movie", r, cid, 0, len(results)
             )
             try:
-                context.bot.sendPhoto(
+                message = context.bot.sendPhoto(
                     chat_id=update.message.chat.id,
                     photo=r["remotePoster"],
                     caption=reply_message,
@@ -587,7 +833,7 @@ class Searcharr(object):
                     logger.error(
                         f"Error sending photo [{r['remotePoster']}]: BadRequest: {e}. Attempting to send with default poster..."
                     )
-                    context.bot.sendPhoto(
+                    message = context.bot.sendPhoto(
                         chat_id=update.message.chat.id,
                         photo="https://artworks.thetvdb.com/banners/images/missing/movie.jpg",
                         caption=reply_message,
@@ -595,6 +841,7 @@ class Searcharr(object):
                     )
                 else:
                     raise
+            self._touch_conversation(cid, message)
 
     def cmd_series(self, update, context):
         logger.debug(f"Received series cmd from [{update.message.from_user.username}]")
@@ -629,7 +876,16 @@ class Searcharr(object):
                 )
             )
             return
-        results = self.sonarr.lookup_series(title)
+        try:
+            results = self._search(
+                self.sonarrs, lambda x: x.lookup_series(title), "tvdbId"
+            )
+        except arr.BackendUnavailable as e:
+            logger.error(f"Error looking up {title}: {e}")
+            update.message.reply_text(
+                self._xlate("backend_unavailable", app=e.app_name)
+            )
+            return
         cid = self._generate_cid()
         # self.conversations.update({cid: {"cid": cid, "type": "series", "results": results}})
         self._create_conversation(
@@ -647,7 +903,7 @@ class Searcharr(object):
                 "series", r, cid, 0, len(results)
             )
             try:
-                context.bot.sendPhoto(
+                message = context.bot.sendPhoto(
                     chat_id=update.message.chat.id,
                     photo=r["remotePoster"],
                     caption=reply_message,
@@ -658,7 +914,7 @@ class Searcharr(object):
                     logger.error(
                         f"Error sending photo [{r['remotePoster']}]: BadRequest: {e}. Attempting to send with default poster..."
                     )
-                    context.bot.sendPhoto(
+                    message = context.bot.sendPhoto(
                         chat_id=update.message.chat.id,
                         photo="https://artworks.thetvdb.com/banners/images/missing/movie.jpg",
                         caption=reply_message,
@@ -666,6 +922,7 @@ class Searcharr(object):
                     )
                 else:
                     raise
+            self._touch_conversation(cid, message)
 
     def cmd_users(self, update, context):
         logger.debug(f"Received users cmd from [{update.message.from_user.username}]")
@@ -722,6 +979,98 @@ class Searcharr(object):
                 reply_markup=reply_markup,
             )
 
+    def cmd_status(self, update, context):
+        logger.debug(f"Received status cmd from [{update.message.from_user.username}]")
+        auth_level = self._authenticated(update.message.from_user.id)
+        if not auth_level:
+            update.message.reply_text(
+                self._xlate(
+                    "auth_required",
+                    commands=" OR ".join(
+                        [
+                            f"`/{c} <{self._xlate('password')}>`"
+                            for c in settings.searcharr_start_command_aliases
+                        ]
+                    ),
+                )
+            )
+            return
+        elif auth_level != 2:
+            update.message.reply_text(
+                self._xlate(
+                    "admin_auth_required",
+                    commands=" OR ".join(
+                        [
+                            f"`/{c} <{self._xlate('admin_password')}>`"
+                            for c in settings.searcharr_start_command_aliases
+                        ]
+                    ),
+                )
+            )
+            return
+
+        lines = []
+        for backend in self.sonarrs + self.radarrs + self._backends("book"):
+            stats = backend.stats()
+            breaker = stats["breaker"]
+            if breaker["state"] == "closed":
+                state = self._xlate("status_ok")
+            elif breaker["state"] == "open":
+                state = self._xlate("status_unavailable", seconds=breaker["retry_in"])
+            else:
+                state = self._xlate("status_recovering")
+            lines.append(
+                self._xlate(
+                    "status_backend",
+                    app=backend.name,
+                    state=state,
+                    failures=breaker["failures"],
+                    trips=breaker["trips"],
+                    saved=stats["coalesced_requests"],
+                )
+            )
+            lines.append(
+                self._xlate(
+                    "status_limiter",
+                    in_flight=stats["limiter"]["in_flight"],
+                    queued=stats["limiter"]["queued"],
+                    limit=stats["limiter"]["limit"],
+                )
+            )
+            for name, library in stats["libraries"].items():
+                lines.append(
+                    self._xlate(
+                        "status_library",
+                        name=name,
+                        items=library["items"],
+                        age=round(library["age"])
+                        if library["age"] is not None
+                        else "-",
+                    )
+                )
+            if stats["searches"]:
+                lines.append(self._xlate("status_searches", **stats["searches"]))
+            for endpoint, transfer in stats["transfers"].items():
+                lines.append(
+                    self._xlate(
+                        "status_transfer",
+                        endpoint=endpoint,
+                        kb=round(transfer["bytes"] / 1024),
+                        requests=transfer["requests"],
+                        reused=transfer["not_modified"] + transfer["unchanged"],
+                        saved=transfer["parse_time_saved"],
+                    )
+                )
+        if lines:
+            lines.append(self._xlate("status_jobs", **self._jobs.stats()))
+            if self._lookup_cache:
+                lines.append(
+                    self._xlate("status_lookup_cache", **self._lookup_cache.stats())
+                )
+        update.message.reply_text(
+            "\n".join(lines) if lines else self._xlate("no_features")
+        )
+
     def callback(self, update, context):
         query = update.callback_query
         logger.debug(
@@ -755,6 +1104,7 @@ class Searcharr(object):
             query.message.delete()
             query.answer()
             return
+        self._touch_conversation(convo["id"], query.message)
 
         cid, i, op = query.data.split("^^^")
         if "^^" in op:
@@ -881,15 +1231,53 @@ class Searcharr(object):
             r = convo["results"][i]
             additional_data = self._get_add_data(cid)
             logger.debug(f"{additional_data=}")
-            paths = (
-                self.sonarr._root_folders
-                if convo["type"] == "series"
-                else self.radarr._root_folders
-                if convo["type"] == "movie"
-                else self.readarr._root_folders
-                if convo["type"] == "book"
-                else []
-            )
+            backends = self._backends(convo["type"])
+            if not additional_data.get("i"):
+                # Only offer the instances that don't have this item yet
+                added_to = [x["name"] for x in r.get("instances", []) if x["id"]]
+                instances = [
+                    (k, x) for k, x in enumerate(backends) if x.name not in added_to
+                ]
+                if len(instances) > 1:
+                    reply_message, reply_markup = self._prepare_response(
+                        convo["type"],
+                        r,
+                        cid,
+                        i,
+                        len(convo["results"]),
+                        add=True,
+                        instances=instances,
+                    )
+                    try:
+                        query.message.edit_media(
+                            media=InputMediaPhoto(r["remotePoster"]),
+                            reply_markup=reply_markup,
+                        )
+                    except BadRequest as e:
+                        if str(e) in self._bad_request_poster_error_messages:
+                            logger.error(
+                                f"Error sending photo [{r['remotePoster']}]: BadRequest: {e}. Attempting to send with default poster..."
+                            )
+                            query.message.edit_media(
+                                media=InputMediaPhoto(
+                                    "https://artworks.thetvdb.com/banners/images/missing/movie.jpg"
+                                ),
+                                reply_markup=reply_markup,
+                            )
+                        else:
+                            raise
+                    query.bot.edit_message_caption(
+                        chat_id=query.message.chat_id,
+                        message_id=query.message.message_id,
+                        caption=reply_message,
+                        reply_markup=reply_markup,
+                    )
+                    query.answer()
+                    return
+                additional_data["i"] = str(instances[0][0] if instances else 0)
+                self._update_add_data(cid, "i", additional_data["i"])
+            backend = backends[int(additional_data["i"])]
+            paths = backend._root_folders
             if not additional_data.get("p"):
                 if len(paths) > 1:
                     reply_message, reply_markup = self._prepare_response(
@@ -938,13 +1326,7 @@ class Searcharr(object):
                         self._xlate(
                             "no_root_folders",
                             kind=self._xlate(convo["type"]),
-                            app="Sonarr"
-                            if convo["type"] == "series"
-                            else "Radarr"
-                            if convo["type"] == "movie"
-                            else "Readarr"
-                            if convo["type"] == "book"
-                            else "???",
+                            app=backend.name,
                         )
                     )
                     query.message.delete()
@@ -973,13 +1355,7 @@ class Searcharr(object):
                         self._update_add_data(cid, "p", path)
 
             if not additional_data.get("q"):
-                quality_profiles = (
-                    self.sonarr._quality_profiles
-                    if convo["type"] == "series"
-                    else self.radarr._quality_profiles
-                    if convo["type"] == "movie"
-                    else self.readarr._quality_profiles
-                )
+                quality_profiles = backend._quality_profiles
                 if len(quality_profiles) > 1:
                     # prepare response to prompt user to select quality profile, and return
                     reply_message, reply_markup = self._prepare_response(
@@ -1028,11 +1404,7 @@ class Searcharr(object):
                         self._xlate(
                             "no_quality_profiles",
                             kind=self._xlate(convo["type"]),
-                            app="Sonarr"
-                            if convo["type"] == "series"
-                            else "Radarr"
-                            if convo["type"] == "movie"
-                            else "Readarr",
+                            app=backend.name,
                         )
                     )
                     query.message.delete()
@@ -1040,7 +1412,7 @@ class Searcharr(object):
                     return
 
             if convo["type"] == "book" and not additional_data.get("m"):
-                metadata_profiles = self.readarr._metadata_profiles
+                metadata_profiles = backend._metadata_profiles
                 if len(metadata_profiles) > 1:
                     # prepare response to prompt user to select quality profile, and return
                     reply_message, reply_markup = self._prepare_response(
@@ -1089,11 +1461,7 @@ class Searcharr(object):
                         self._xlate(
                             "no_metadata_profiles",
                             kind=self._xlate(convo["type"]),
-                            app="Sonarr"
-                            if convo["type"] == "series"
-                            else "Radarr"
-                            if convo["type"] == "movie"
-                            else "Readarr",
+                            app=backend.name,
                         )
                     )
                     query.message.delete()
@@ -1149,21 +1517,21 @@ class Searcharr(object):
                 return
 
             if convo["type"] == "series":
-                all_tags = self.sonarr.get_filtered_tags(
+                all_tags = backend.get_filtered_tags(
                     settings.sonarr_user_selectable_tags,
                     settings.sonarr_forced_tags,
                 )
                 allow_user_to_select_tags = settings.sonarr_allow_user_to_select_tags
                 forced_tags = settings.sonarr_forced_tags
             elif convo["type"] == "movie":
-                all_tags = self.radarr.get_filtered_tags(
+                all_tags = backend.get_filtered_tags(
                     settings.radarr_user_selectable_tags,
                     settings.radarr_forced_tags,
                 )
                 allow_user_to_select_tags = settings.radarr_allow_user_to_select_tags
                 forced_tags = settings.radarr_forced_tags
             elif convo["type"] == "book":
-                all_tags = self.readarr.get_filtered_tags(
+                all_tags = backend.get_filtered_tags(
                     settings.readarr_user_selectable_tags,
                     settings.readarr_forced_tags,
                 )
@@ -1172,7 +1540,7 @@ class Searcharr(object):
             if allow_user_to_select_tags and not additional_data.get("td"):
                 if not len(all_tags):
                     logger.warning(
-                        f"User tagging is enabled, but no tags found. Make sure there are tags{' in Sonarr' if convo['type'] == 'series' else ' in Radarr' if convo['type'] == 'movie' else ' in Readarr' if convo['type'] == 'book' else ''} matching your Searcharr configuration."
+                        f"User tagging is enabled, but no tags found. Make sure there are tags in {backend.name} matching your Searcharr configuration."
                     )
                 elif not additional_data.get("tt"):
                     reply_message, reply_markup = self._prepare_response(
@@ -1228,69 +1596,65 @@ class Searcharr(object):
             )
             logger.debug(f"{tags=}")
             if convo["type"] == "series":
-                get_tag_id = self.sonarr.get_tag_id
+                ensure_tags = backend.ensure_tags
                 tag_with_username = settings.sonarr_tag_with_username
             elif convo["type"] == "movie":
-                get_tag_id = self.radarr.get_tag_id
+                ensure_tags = backend.ensure_tags
                 tag_with_username = settings.radarr_tag_with_username
             elif convo["type"] == "book":
-                get_tag_id = self.readarr.get_tag_id
+                ensure_tags = backend.ensure_tags
                 tag_with_username = settings.readarr_tag_with_username
-            if tag_with_username:
-                tag = f"searcharr-{query.from_user.username if query.from_user.username else query.from_user.id}"
-                if tag_id := get_tag_id(tag):
+            user_tag = (
+                f"searcharr-{query.from_user.username if query.from_user.username else query.from_user.id}"
+                if tag_with_username
+                else None
+            )
+            # Look up (or create) all of the tags for this add at once
+            tag_ids = ensure_tags(([user_tag] if user_tag else []) + forced_tags)
+            if user_tag:
+                if tag_id := tag_ids.get(user_tag):
                     tags.append(str(tag_id))
                 else:
-                    self.logger.warning(
-                        f"Tag lookup/creation failed for [{tag}]. This tag will not be added to the {convo['type']}."
+                    logger.warning(
+                        f"Tag lookup/creation failed for [{user_tag}]. This tag will not be added to the {convo['type']}."
                     )
             for tag in forced_tags:
-                if tag_id := get_tag_id(tag):
+                if tag_id := tag_ids.get(tag):
                     tags.append(str(tag_id))
                 else:
-                    self.logger.warning(
+                    logger.warning(
                         f"Tag lookup/creation failed for forced tag [{tag}]. This tag will not be added to the {convo['type']}."
                     )
             self._update_add_data(cid, "t", ",".join(list(set(tags))))
 
-            logger.debug("All data is accounted for, proceeding to add...")
-            try:
-                if convo["type"] == "series":
-                    added = self.sonarr.add_series(
-                        series_info=r,
-                        monitored=settings.sonarr_add_monitored,
-                        search=settings.sonarr_search_on_add,
-                        additional_data=self._get_add_data(cid),
-                    )
-                elif convo["type"] == "movie":
-                    added = self.radarr.add_movie(
-                        movie_info=r,
-                        monitored=settings.radarr_add_monitored,
-                        search=settings.radarr_search_on_add,
-                        min_avail=settings.radarr_min_availability,
-                        additional_data=self._get_add_data(cid),
-                    )
-                elif convo["type"] == "book":
-                    added = self.readarr.add_book(
-                        book_info=r,
-                        monitored=settings.readarr_add_monitored,
-                        search=settings.readarr_search_on_add,
-                        additional_data=self._get_add_data(cid),
-                    )
-                else:
-                    added = False
-            except Exception as e:
-                logger.error(f"Error adding {convo['type']}: {e}")
-                added = False
-            logger.debug(f"Result of attempt to add {convo['type']}: {added}")
-            if added:
-                self._delete_conversation(cid)
-                query.message.reply_text(self._xlate("added", title=r["title"]))
-                query.message.delete()
-            else:
-                query.message.reply_text(
-                    self._xlate("unknown_error_adding", kind=convo["type"])
-                )
+            logger.debug("All data is accounted for, queueing the add...")
+            # The add runs on a worker thread, which updates this message when it finishes
+            external_id = r.get(
+                {"series": "tvdbId", "movie": "tmdbId", "book": "foreignBookId"}[
+                    convo["type"]
+                ]
+            )
+            self._jobs.submit(
+                "add",
+                {
+                    "type": convo["type"],
+                    "backend": backend.name,
+                    "info": r,
+                    "additional_data": self._get_add_data(cid),
+                    "chat_id": query.message.chat_id,
+                    "message_id": query.message.message_id,
+                },
+                # Adds of the same item run one after another, so the later ones find it added
+                key=f"{backend.name} {external_id}",
+            )
+            self._delete_conversation(cid)
+            query.bot.edit_message_caption(
+                chat_id=query.message.chat_id,
+                message_id=query.message.message_id,
+                caption=self._xlate("add_queued", title=r["title"]),
+                reply_markup=None,
+            )
+            query.answer()
         elif op == "remove_user":
             if auth_level != 2:
                 query.message.reply_text(
@@ -1447,6 +1811,7 @@ class Searcharr(object):
         metadata_profiles=None,
         monitor_options=None,
         tags=None,
+        instances=None,
     ):
         keyboard = []
         keyboardNavRow = []
@@ -1489,7 +1854,17 @@ class Searcharr(object):
         keyboard.append(keyboardNavRow)
 
         if add:
-            if tags:
+            if instances:
+                for k, b in instances:
+                    keyboard.append(
+                        [
+                            InlineKeyboardButton(
+                                self._xlate("add_instance_button", instance=b.name),
+                                callback_data=f"{cid}^^^{i}^^^add^^i={k}",
+                            )
+                        ],
+                    )
+            elif tags:
                 for tag in tags[:12]:
                     keyboard.append(
                         [
@@ -1605,6 +1980,13 @@ class Searcharr(object):
         else:
             reply_message = self._xlate("unexpected_error")
 
+        if kind != "book" and len(self._backends(kind)) > 1:
+            added_to = [x["name"] for x in r.get("instances", []) if x["id"]]
+            if added_to:
+                reply_message = f"{self._xlate('already_in_instances', instances=', '.join(added_to))}\n{reply_message}"[
+                    0:1024
+                ]
+
         return (reply_message, reply_markup)
 
     def _prepare_response_users(self, cid, users, offset, num, total_results):
@@ -1663,6 +2045,13 @@ class Searcharr(object):
             update.callback_query.answer()
         except Exception:
             pass
+        if isinstance(context.error, arr.BackendUnavailable):
+            try:
+                update.effective_message.reply_text(
+                    self._xlate("backend_unavailable", app=context.error.app_name)
+                )
+            except Exception:
+                pass
 
     def cmd_help(self, update, context):
         logger.debug(f"Received help cmd from [{update.message.from_user.username}]")
@@ -1731,6 +2120,12 @@ class Searcharr(object):
                     [f"/{c}" for c in settings.searcharr_users_command_aliases]
                 ),
             )
+            resp += " " + self._xlate(
+                "admin_status_help",
+                commands=" OR ".join(
+                    [f"/{c}" for c in settings.searcharr_status_command_aliases]
+                ),
+            )
 
         update.message.reply_text(resp)
 
@@ -1746,7 +2141,24 @@ class Searcharr(object):
 
     def run(self):
         self._init_db()
+        self._load_users()
+        if settings.searcharr_webhook_enabled:
+            self._start_webhook_listener()
         updater = Updater(self.token, use_context=True)
+        self._bot = updater.bot
+        self._jobs = jobs.JobQueue(
+            os.path.join(DBPATH, DBFILE),
+            self._run_job,
+            workers=settings.searcharr_add_workers,
+            logger=logger,
+        )
+        self._jobs.start()
+        if settings.searcharr_conversation_ttl:
+            updater.job_queue.run_repeating(
+                self._expire_conversations,
+                interval=settings.searcharr_conversation_sweep_interval,
+                first=60,
+            )
 
         for c in settings.searcharr_help_command_aliases:
             logger.debug(f"Registering [/{c}] as a help command")
@@ -1767,6 +2179,9 @@ class Searcharr(object):
         for c in settings.searcharr_users_command_aliases:
             logger.debug(f"Registering [/{c}] as a users command")
             updater.dispatcher.add_handler(CommandHandler(c, self.cmd_users))
+        for c in settings.searcharr_status_command_aliases:
+            logger.debug(f"Registering [/{c}] as a status command")
+            updater.dispatcher.add_handler(CommandHandler(c, self.cmd_status))
         updater.dispatcher.add_handler(CallbackQueryHandler(self.callback))
         if not self.DEV_MODE:
             updater.dispatcher.add_error_handler(self.handle_error)
@@ -1778,17 +2193,206 @@ class Searcharr(object):
         updater.start_polling()
         updater.idle()
 
+    def _start_webhook_listener(self):
+        # Anyone who can reach the listener can change the library caches
+        if not settings.searcharr_webhook_password and not webhook.is_loopback(
+            settings.searcharr_webhook_host
+        ):
+            logger.error(
+                f"Not listening for webhooks on [{settings.searcharr_webhook_host}] without a password. Please set searcharr_webhook_password in settings.py, or set searcharr_webhook_host to 127.0.0.1."
+            )
+            return
+        handlers = {}
+        for v in self.sonarrs + self.radarrs + self._backends("book"):
+            # Webhooks keep the library caches current, so polling is only a consistency sweep
+            v.set_library_ttl(settings.searcharr_webhook_sweep_interval)
+            # Additional instances each get their own path, e.g. /sonarr/sonarr-4k
+            k = v.app_name.lower()
+            handlers[k if v.name == v.app_name else f"{k}/{v.slug}"] = v.handle_webhook
+        self._webhook_listener = webhook.WebhookListener(
+            settings.searcharr_webhook_host,
+            settings.searcharr_webhook_port,
+            handlers,
+            password=settings.searcharr_webhook_password,
+            logger=logger,
+        )
+        self._webhook_listener.start()
+
+    def _instances(self, app):
+        # The app's own settings describe its default instance, and {app}_instances lists any others
+        if not getattr(settings, f"{app}_enabled", False):
+            return []
+        instances = [
+            {
+                "name": getattr(settings, f"{app}_instance_name", None)
+                or app.capitalize(),
+                "url": getattr(settings, f"{app}_url"),
+                "api_key": getattr(settings, f"{app}_api_key"),
+            }
+        ] + getattr(settings, f"{app}_instances", [])
+
+        # Instances are told apart by name, in the lookup cache, queued adds and webhook paths
+        errors = []
+        slugs = {}
+        for n, x in enumerate(instances):
+            setting = f"{app}_instance_name" if n == 0 else f"{app}_instances[{n - 1}]"
+            if not x.get("name") or not arr.slugify(x["name"]):
+                errors.append(f"{setting} needs a name made of letters or numbers")
+            elif arr.slugify(x["name"]) in slugs:
+                errors.append(
+                    f"{setting} is named [{x['name']}], which is too similar to [{slugs[arr.slugify(x['name'])]}]. Each {app.capitalize()} instance needs a unique name"
+                )
+            else:
+                slugs[arr.slugify(x["name"])] = x["name"]
+            if not x.get("url") or not x.get("api_key"):
+                errors.append(f"{setting} needs a url and api_key")
+        if errors:
+            for e in errors:
+                logger.error(f"Invalid {app.capitalize()} instance settings: {e}.")
+            raise ValueError(
+                f"Invalid {app.capitalize()} instance settings: {'; '.join(errors)}"
+            )
+        return instances
+
+    def _backends(self, kind):
+        return {
+            "series": self.sonarrs,
+            "movie": self.radarrs,
+            "book": [self.readarr] if self.readarr else [],
+        }[kind]
+
+    def _start_backends(self, backends):
+        # Bootstrap every configured instance concurrently, keeping their order
+        start = time.monotonic()
+        instances = [(cls, x) for cls, xs in backends for x in xs]
+        with ThreadPoolExecutor(
+            max_workers=max(len(instances), 1), thread_name_prefix="searcharr-startup"
+        ) as executor:
+            futures = [
+                executor.submit(
+                    cls,
+                    x["url"],
+                    x["api_key"],
+                    args.verbose,
+                    name=x.get("name"),
+                    **self._arr_options,
+                )
+                for cls, x in instances
+            ]
+        clients = [f.result() for f in futures]
+        for client in clients:
+            phases = ", ".join(
+                f"{k}={v:.2f}s" for k, v in client.startup_timings.items()
+            )
+            logger.info(f"{client.name} startup timings: {phases}")
+        logger.info(f"Backends started in {time.monotonic() - start:.2f}s")
+        clients = iter(clients)
+        return [[next(clients) for _ in xs] for _, xs in backends]
+
+    def _search(self, backends, lookup, key):
+        # Search every instance concurrently and merge the results by external id,
+        # noting which instances already have each item
+        def search(backend):
+            try:
+                return lookup(backend)
+            except arr.BackendUnavailable as e:
+                logger.warning(f"Skipping {backend.name} in search results: {e}")
+                return e
+
+        if len(backends) == 1:
+            results = [lookup(backends[0])]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=len(backends), thread_name_prefix="searcharr-search"
+            ) as executor:
+                results = list(executor.map(search, backends))
+            if all(isinstance(x, arr.BackendUnavailable) for x in results):
+                raise results[0]
+
+        merged = {}
+        for backend, found in zip(backends, results):
+            if isinstance(found, arr.BackendUnavailable):
+                continue
+            for i, r in enumerate(found):
+                item = merged.setdefault(r.get(key) or (backend.name, i), r)
+                item.setdefault("instances", []).append(
+                    {"name": backend.name, "id": r["id"]}
+                )
+        for r in merged.values():
+            ids = [x["id"] for x in r["instances"]]
+            # Offer to add the item if any instance is missing it
+            r["id"] = ids[0] if all(ids) else 0
+        return list(merged.values())
+
+    def _run_job(self, kind, job):
+        logger.debug(
+            f"Running {kind} job for {job['type']} [{job['info']['title']}]..."
+        )
+        backend = next(
+            (x for x in self._backends(job["type"]) if x.name == job["backend"]), None
+        )
+        caption = self._xlate("unknown_error_adding", kind=job["type"])
+        added = False
+        try:
+            if not backend:
+                logger.error(f"{job['backend']} is no longer configured")
+            elif job["type"] == "series":
+                added = backend.add_series(
+                    series_info=job["info"],
+                    monitored=settings.sonarr_add_monitored,
+                    search=settings.sonarr_search_on_add,
+                    additional_data=job["additional_data"],
+                )
+            elif job["type"] == "movie":
+                added = backend.add_movie(
+                    movie_info=job["info"],
+                    monitored=settings.radarr_add_monitored,
+                    search=settings.radarr_search_on_add,
+                    min_avail=settings.radarr_min_availability,
+                    additional_data=job["additional_data"],
+                )
+            elif job["type"] == "book":
+                added = backend.add_book(
+                    book_info=job["info"],
+                    monitored=settings.readarr_add_monitored,
+                    search=settings.readarr_search_on_add,
+                    additional_data=job["additional_data"],
+                )
+        except arr.BackendUnavailable as e:
+            logger.error(f"Error adding {job['type']}: {e}")
+            caption = self._xlate("backend_unavailable", app=e.app_name)
+        except Exception as e:
+            logger.error(f"Error adding {job['type']}: {e}")
+        logger.debug(f"Result of attempt to add {job['type']}: {added}")
+        if added:
+            caption = self._xlate("added", title=job["info"]["title"])
+        try:
+            self._bot.edit_message_caption(
+                chat_id=job["chat_id"],
+                message_id=job["message_id"],
+                caption=caption,
+                reply_markup=None,
+            )
+        except TelegramError as e:
+            logger.error(f"Error updating message after adding {job['type']}: {e}")
+        return added
+
     def _create_conversation(self, id, username, kind, results):
+        # Each result gets its own row, so paging through them reads just the one shown
         con, cur = self._get_con_cur()
-        q = "INSERT OR REPLACE INTO conversations (id, username, type, results) VALUES (?, ?, ?, ?)"
-        qa = (id, username, kind, json.dumps(results))
+        q = "INSERT OR REPLACE INTO conversations (id, username, type, result_count, created, last_touched) VALUES (?, ?, ?, ?, ?, ?)"
+        now = time.time()
+        qa = (id, username, kind, len(results), now, now)
         logger.debug(f"Executing query: [{q}] with args: [{qa}]")
         try:
-            with DBLOCK:
+            with con:
                 cur.execute(q, qa)
-                con.commit()
-                con.close()
-                return True
+                cur.execute("DELETE FROM conversation_results WHERE cid=?;", (id,))
+                cur.executemany(
+                    "INSERT INTO conversation_results (cid, idx, result) VALUES (?, ?, ?)",
+                    [(id, idx, json.dumps(r)) for idx, r in enumerate(results)],
+                )
+            return True
         except sqlite3.Error as e:
             logger.error(
                 f"Error executing database query to create conversation [{q}]: {e}"
@@ -1811,7 +2415,6 @@ class Searcharr(object):
             if not r:
                 return None
             elif not len(r.fetchall()):
-                con.close()
                 return u
             else:
                 logger.warning("Detected conversation id collision. Interesting.")
@@ -1833,13 +2436,125 @@ class Searcharr(object):
             record = r.fetchone()
             if record:
                 logger.debug(f"Found conversation {record['id']} in the database")
-                record.update({"results": json.loads(record["results"])})
-            con.close()
+                if record["result_count"] is None:
+                    # Conversations created by older versions hold all of their results in one column
+                    results = json.loads(record["results"] or "[]")
+                else:
+                    results = ConversationResults(
+                        record["result_count"],
+                        lambda idx: self._get_conversation_result(id, idx),
+                    )
+                record.update({"results": results})
             return record
 
         logger.debug(f"Found no conversation for id [{id}]")
         return None
 
+    def _get_conversation_result(self, cid, idx):
+        q = "SELECT result FROM conversation_results WHERE cid=? AND idx=?;"
+        qa = (cid, idx)
+        logger.debug(f"Executing query: [{q}] with args: [{qa}]...")
+        try:
+            con, cur = self._get_con_cur()
+            record = cur.execute(q, qa).fetchone()
+        except sqlite3.Error as e:
+            logger.error(
+                f"Error executing database query to look up conversation result from the database [{q}]: {e}"
+            )
+            raise
+
+        return json.loads(record["result"]) if record else None
+
+    def _touch_conversation(self, id, message=None):
+        # Keep the conversation from expiring, and remember which message shows it
+        con, cur = self._get_con_cur()
+        if message:
+            q = "UPDATE conversations SET last_touched=?, chat_id=?, message_id=? WHERE id=?;"
+            qa = (time.time(), message.chat_id, message.message_id, id)
+        else:
+            q = "UPDATE conversations SET last_touched=? WHERE id=?;"
+            qa = (time.time(), id)
+        logger.debug(f"Executing query: [{q}] with args: [{qa}]")
+        try:
+            with con:
+                cur.execute(q, qa)
+            return True
+        except sqlite3.Error as e:
+            logger.error(
+                f"Error executing database query to update conversation [{q}]: {e}"
+            )
+            return False
+
+    def _expire_conversations(self, context=None):
+        # Remove conversations nobody has touched within the TTL, along with their add data,
+        # and hand the freed pages back to the filesystem
+        cutoff = time.time() - settings.searcharr_conversation_ttl
+        con, cur = self._get_con_cur()
+        try:
+            expired = cur.execute(
+                "SELECT id, chat_id, message_id FROM conversations WHERE last_touched < ?;",
+                (cutoff,),
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error looking up expired conversations: {e}")
+            return 0
+
+        action = settings.searcharr_stale_message_action
+        for x in expired:
+            if not context or not x["message_id"] or action not in ["delete", "strip"]:
+                continue
+            try:
+                if action == "delete":
+                    context.bot.delete_message(
+                        chat_id=x["chat_id"], message_id=x["message_id"]
+                    )
+                else:
+                    context.bot.edit_message_reply_markup(
+                        chat_id=x["chat_id"],
+                        message_id=x["message_id"],
+                        reply_markup=None,
+                    )
+            except TelegramError as e:
+                # Telegram refuses to delete messages older than 48 hours, for one
+                logger.debug(
+                    f"Unable to {action} message for expired conversation [{x['id']}]: {e}"
+                )
+
+        try:
+            with con:
+                cur.executemany(
+                    "DELETE FROM add_data WHERE cid=?;", [(x["id"],) for x in expired]
+                )
+                cur.executemany(
+                    "DELETE FROM conversation_results WHERE cid=?;",
+                    [(x["id"],) for x in expired],
+                )
+                cur.executemany(
+                    "DELETE FROM conversations WHERE id=?;",
+                    [(x["id"],) for x in expired],
+                )
+                # Data left behind by conversations removed some other way
+                cur.execute(
+                    "DELETE FROM add_data WHERE cid NOT IN (SELECT id FROM conversations);"
+                )
+                cur.execute(
+                    "DELETE FROM conversation_results WHERE cid NOT IN (SELECT id FROM conversations);"
+                )
+            pages = cur.execute("PRAGMA freelist_count;").fetchone()["freelist_count"]
+            if pages:
+                # executescript steps the vacuum to completion, where execute frees one page
+                con.executescript("PRAGMA incremental_vacuum;")
+                cur.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        except sqlite3.Error as e:
+            logger.error(f"Error removing expired conversations: {e}")
+            return 0
+
+        if expired or pages:
+            logger.info(
+                f"Expired {len(expired)} conversation(s) and reclaimed {pages} database page(s)"
+            )
+        return len(expired)
+
     def _delete_conversation(self, id):
         self._clear_add_data(id)
         q = "DELETE FROM conversations WHERE id=?;"
@@ -1847,11 +2562,10 @@ class Searcharr(object):
         logger.debug(f"Executing query: [{q}] with args: [{qa}]")
         try:
             con, cur = self._get_con_cur()
-            with DBLOCK:
+            with con:
                 cur.execute(q, qa)
-                con.commit()
-                con.close()
-                return True
+                cur.execute("DELETE FROM conversation_results WHERE cid=?;", qa)
+            return True
         except sqlite3.Error as e:
             logger.error(
                 f"Error executing database query to delete conversation from the database [{q}]: {e}"
@@ -1873,7 +2587,6 @@ class Searcharr(object):
 
         if r:
             records = r.fetchall()
-            con.close()
             logger.debug(f"Query response: {records}")
             return {x["key"]: x["value"] for x in records}
         else:
@@ -1885,11 +2598,9 @@ class Searcharr(object):
         qa = (cid, key, value)
         logger.debug(f"Executing query: [{q}] with args: [{qa}]")
         try:
-            with DBLOCK:
+            with con:
                 cur.execute(q, qa)
-                con.commit()
-                con.close()
-                return True
+            return True
         except sqlite3.Error as e:
             logger.error(f"Error executing database query [{q}]: {e}")
             raise
@@ -1900,11 +2611,9 @@ class Searcharr(object):
         logger.debug(f"Executing query: [{q}] with args: [{qa}]")
         try:
             con, cur = self._get_con_cur()
-            with DBLOCK:
+            with con:
                 cur.execute(q, qa)
-                con.commit()
-                con.close()
-                return True
+            return True
         except sqlite3.Error as e:
             logger.error(
                 f"Error executing database query to delete conversation add data from the database [{q}]: {e}"
@@ -1917,14 +2626,15 @@ class Searcharr(object):
         qa = (id, username, admin)
         logger.debug(f"Executing query: [{q}] with args: [{qa}]")
         try:
-            with DBLOCK:
+            with con:
                 cur.execute(q, qa)
-                con.commit()
-                con.close()
-                return True
         except sqlite3.Error as e:
             logger.error(f"Error executing database query [{q}]: {e}")
             raise
+        self._cache_user(
+            id, {"id": id, "username": username, "admin": admin, "permissions": None}
+        )
+        return True
 
     def _remove_user(self, id):
         con, cur = self._get_con_cur()
@@ -1932,37 +2642,25 @@ class Searcharr(object):
         qa = (id,)
         logger.debug(f"Executing query: [{q}] with args: [{qa}]")
         try:
-            with DBLOCK:
+            with con:
                 cur.execute(q, qa)
-                con.commit()
-                con.close()
-                return True
         except sqlite3.Error as e:
             logger.error(f"Error executing database query [{q}]: {e}")
             raise
+        self._cache_user(id, None)
+        return True
 
     def _get_users(self, admin=False):
-        adminQ = " where IFNULL(admin, '') != ''" if admin else ""
-        q = f"SELECT * FROM users{adminQ};"
-        logger.debug(f"Executing query: [{q}] with no args...")
-        try:
-            con, cur = self._get_con_cur()
-            r = cur.execute(q)
-        except sqlite3.Error as e:
-            r = None
-            logger.error(
-                f"Error executing database query to look up users from the database [{q}]: {e}"
+        users = [
+            dict(x["user"])
+            for _, x in sorted(self._get_user_cache().items())
+            if x["user"]["admin"] or not admin
+        ]
+        if not users:
+            logger.debug(
+                f"Found no {'admin ' if admin else ''}users in the database (this seems wrong)."
             )
-
-        if r:
-            records = r.fetchall()
-            con.close()
-            return records
-
-        logger.debug(
-            f"Found no {'admin ' if admin else ''}users in the database (this seems wrong)."
-        )
-        return []
+        return users
 
     def _update_admin_access(self, user_id, admin=""):
         con, cur = self._get_con_cur()
@@ -1970,40 +2668,72 @@ class Searcharr(object):
         qa = (str(admin), user_id)
         logger.debug(f"Executing query: [{q}] with args: [{qa}]")
         try:
-            with DBLOCK:
+            with con:
                 cur.execute(q, qa)
-                con.commit()
-                con.close()
-                return True
         except sqlite3.Error as e:
             logger.error(f"Error executing database query [{q}]: {e}")
             raise
+        user = self._get_user_cache().get(user_id)
+        if user:
+            self._cache_user(user_id, dict(user["user"], admin=str(admin)))
+        return True
 
     def _authenticated(self, user_id):
-        # Return True if user is authenticated
+        # Return 2 if user is an admin, 1 if user is authenticated
         # Else return False
-        q = "SELECT * FROM users WHERE id=?;"
-        qa = (user_id,)
-        logger.debug(f"Executing query: [{q}] with args: [{qa}]...")
+        user = self._get_user_cache().get(user_id)
+        if user:
+            return 2 if user["user"]["admin"] else 1
+
+        logger.debug(f"Did not find user [{user_id}] in the database.")
+        return False
+
+    def _get_user_cache(self):
+        if self._users is None:
+            self._load_users()
+        return self._users
+
+    def _load_users(self):
+        q = "SELECT * FROM users;"
+        logger.debug(f"Executing query: [{q}] with no args...")
         try:
             con, cur = self._get_con_cur()
-            r = cur.execute(q, qa)
+            records = cur.execute(q).fetchall()
         except sqlite3.Error as e:
-            r = None
             logger.error(
-                f"Error executing database query to look up user from the database [{q}]: {e}"
+                f"Error executing database query to look up users from the database [{q}]: {e}"
             )
-            return False
-
-        if r:
-            record = r.fetchone()
-            logger.debug(f"Query result for user lookup: {record}")
-            con.close()
-            if record and record["id"] == user_id:
-                return 2 if record["admin"] else 1
+            raise
 
-        logger.debug(f"Did not find user [{user_id}] in the database.")
-        return False
+        with self._users_lock:
+            self._users = {
+                x["id"]: {"user": x, "permissions": self._permission_mask(x)}
+                for x in records
+            }
+        logger.debug(f"Loaded {len(records)} users from the database")
+
+    def _cache_user(self, id, user):
+        # Readers never lock, so the cache is replaced rather than modified
+        self._get_user_cache()
+        with self._users_lock:
+            users = dict(self._users)
+            if user:
+                users[id] = {"user": user, "permissions": self._permission_mask(user)}
+            else:
+                users.pop(id, None)
+            self._users = users
+
+    def _permission_mask(self, user):
+        # A comma-separated list of apps, or a bitmask; empty grants access to all apps
+        permissions = str(user.get("permissions") or "").strip()
+        if not permissions:
+            return ALL_PERMISSIONS
+        if permissions.isdigit():
+            return int(permissions)
+        mask = 0
+        for app in permissions.split(","):
+            mask |= PERMISSIONS.get(app.strip().lower(), 0)
+        return mask
 
     def _dict_factory(self, cursor, row):
         """From sqlite3 documentation:
@@ -2015,7 +2745,12 @@ class Searcharr(object):
         return d
 
     def _get_con_cur(self):
-        # Connect to local DB and return tuple containing connection and cursor
+        # Return tuple containing this thread's connection to the local DB and a new cursor,
+        # connecting on first use
+        con = getattr(self._db, "con", None)
+        if con:
+            return (con, con.cursor())
+
         if not os.path.isdir(DBPATH):
             try:
                 logger.debug(
@@ -2028,7 +2763,10 @@ class Searcharr(object):
 
         try:
             con = sqlite3.connect(os.path.join(DBPATH, DBFILE), timeout=30)
-            con.execute("PRAGMA journal_mode = off;")
+            # WAL lets readers carry on while a write is in progress, and survives a crash
+            con.execute("PRAGMA journal_mode = WAL;")
+            con.execute("PRAGMA synchronous = NORMAL;")
+            con.execute("PRAGMA busy_timeout = 30000;")
             con.row_factory = self._dict_factory
             cur = con.cursor()
             logger.debug(
@@ -2038,6 +2776,7 @@ class Searcharr(object):
             logger.error(f"Error connecting to database: {e}")
             raise
 
+        self._db.con = con
         return (con, cur)
 
     def _init_db(self):
@@ -2047,7 +2786,18 @@ class Searcharr(object):
                 id text primary key,
                 username text not null,
                 type text,
-                results text
+                results text,
+                created real,
+                last_touched real,
+                chat_id integer,
+                message_id integer,
+                result_count integer
+            );""",
+            """CREATE TABLE IF NOT EXISTS conversation_results (
+                cid text,
+                idx integer,
+                result text,
+                primary key (cid, idx)
             );""",
             """CREATE TABLE IF NOT EXISTS users (
                 id integer primary key,
@@ -2065,14 +2815,43 @@ class Searcharr(object):
         for q in queries:
             logger.debug(f"Executing query: [{q}] with no args...")
             try:
-                with DBLOCK:
+                with con:
                     cur.execute(q)
             except sqlite3.Error as e:
                 logger.error(f"Error executing database query [{q}]: {e}")
                 raise
 
-        con.commit()
-        con.close()
+        # Add columns missing from databases created by older versions
+        columns = [x["name"] for x in cur.execute("PRAGMA table_info(conversations)")]
+        try:
+            with con:
+                for c, t in [
+                    ("created", "real"),
+                    ("last_touched", "real"),
+                    ("chat_id", "integer"),
+                    ("message_id", "integer"),
+                    ("result_count", "integer"),
+                ]:
+                    if c not in columns:
+                        cur.execute(f"ALTER TABLE conversations ADD COLUMN {c} {t}")
+                # Existing conversations start their TTL now
+                cur.execute(
+                    "UPDATE conversations SET created=?, last_touched=? WHERE last_touched IS NULL;",
+                    (time.time(), time.time()),
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Error upgrading conversations table: {e}")
+            raise
+
+        # Space freed by expired conversations is returned to the filesystem by
+        # incremental vacuums, which need a full vacuum once to take effect on an existing database
+        if cur.execute("PRAGMA auto_vacuum;").fetchone()["auto_vacuum"] != 2:
+            logger.info("Enabling incremental vacuum on the database...")
+            try:
+                cur.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+                cur.execute("VACUUM;")
+            except sqlite3.Error as e:
+                logger.error(f"Error enabling incremental vacuum on the database: {e}")
 
     def _load_language(self, lang_ietf=None):
         if not lang_ietf:
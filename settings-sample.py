@@ -12,6 +12,30 @@ searcharr_language = "en-us"  # yml file in the lang folder
 searcharr_start_command_aliases = ["start"]  # Override /start command
 searcharr_help_command_aliases = ["help"]  # Override /help command
 searcharr_users_command_aliases = ["users"]  # Override /users command
+searcharr_status_command_aliases = ["status"]  # Override /status command
+searcharr_arr_pool_size = 10  # Max keep-alive connections held open to each of Sonarr/Radarr/Readarr
+searcharr_arr_connect_timeout = 5  # Seconds to wait for a connection to Sonarr/Radarr/Readarr
+searcharr_arr_read_timeout = 30  # Seconds to wait for a response from Sonarr/Radarr/Readarr
+searcharr_arr_dns_cache_ttl = 300  # Seconds to cache DNS lookups for Sonarr/Radarr/Readarr hosts - 0 to disable
+searcharr_arr_version_cache_ttl = 86400  # Seconds to remember each Sonarr/Radarr/Readarr API version between restarts - 0 to probe on every start
+searcharr_arr_retries = 2  # Times to retry a failed Sonarr/Radarr/Readarr lookup - 0 to disable
+searcharr_arr_breaker_threshold = 5  # Consecutive failures before Searcharr stops calling an unresponsive Sonarr/Radarr/Readarr
+searcharr_arr_breaker_reset = 30  # Seconds to wait before trying an unresponsive Sonarr/Radarr/Readarr again
+searcharr_arr_max_concurrency = 10  # Upper bound on concurrent requests to each of Sonarr/Radarr/Readarr - the actual limit adapts to response times
+searcharr_add_workers = 2  # Number of background workers adding series/movies/books - queued adds are resumed after a restart
+searcharr_search_batch_window = 10  # Seconds to collect searches for newly added items so they're sent to Sonarr/Radarr/Readarr together - 0 to search as soon as each item is added
+searcharr_search_off_peak = []  # e.g. [1, 6] to hold searches for newly added items until between 1:00 and 6:00 - leave empty to search right away
+searcharr_conversation_ttl = 86400  # Seconds before an abandoned search is forgotten - 0 to keep searches until they are finished
+searcharr_conversation_sweep_interval = 3600  # Seconds between checks for abandoned searches
+searcharr_stale_message_action = "strip"  # What to do with the message for an abandoned search: "strip" its buttons, "delete" it (only possible within 48 hours), or "keep" it
+searcharr_lookup_cache_ttl = 300  # Seconds to reuse series/movie/book search results - 0 to disable
+searcharr_lookup_cache_size = 256  # Max number of searches to keep in the lookup cache
+searcharr_lookup_cache_persist = False  # True to keep the lookup cache in the data folder across restarts
+searcharr_webhook_enabled = False  # True to keep library caches up to date from Sonarr/Radarr/Readarr webhooks (Settings > Connect > Webhook)
+searcharr_webhook_host = "127.0.0.1"  # Address to listen on for webhooks - use "0.0.0.0" if Sonarr/Radarr/Readarr run on another host (requires searcharr_webhook_password)
+searcharr_webhook_port = 5059  # Port to listen on for webhooks - point the webhook URL at http://<searcharr host>:5059/sonarr (or /radarr, /readarr)
+searcharr_webhook_password = ""  # Required unless listening on 127.0.0.1 - use it as the password (with any username) in the Sonarr/Radarr/Readarr webhook settings
+searcharr_webhook_sweep_interval = 900  # Seconds between full library refreshes while webhooks are enabled
 
 # Telegram
 tgram_token = ""
@@ -30,6 +54,8 @@ sonarr_user_selectable_tags = []  # e.g. ["custom-tag-1", "custom-tag-2"] - leav
 sonarr_series_command_aliases = ["series"]  # e.g. ["series", "tv", "t"]
 sonarr_series_paths = []  # e.g. ["/tv", "/anime"] - can be full path or id value - leave empty to enable all
 sonarr_season_monitor_prompt = False  # False - always monitor all seasons; True - prompt user to select from All, First, or Latest season(s)
+sonarr_instance_name = "Sonarr"  # Name shown to users when more than one Sonarr instance is configured
+sonarr_instances = []  # Additional Sonarr instances to search, e.g. [{"name": "Sonarr 4K", "url": "http://192.168.0.100:8990", "api_key": "", "quality_profile_id": ["Ultra-HD"], "series_paths": ["/tv-4k"]}] - quality_profile_id and series_paths are optional
 
 # Radarr
 radarr_enabled = True
@@ -45,6 +71,8 @@ radarr_user_selectable_tags = []  # e.g. ["custom-tag-1", "custom-tag-2"] - leav
 radarr_min_availability = "released"  # options: "announced", "inCinemas", "released"
 radarr_movie_command_aliases = ["movie"]  # e.g. ["movie", "mv", "m"]
 radarr_movie_paths = []  # e.g. ["/movies", "/other-movies"] - can be full path or id value - leave empty to enable all
+radarr_instance_name = "Radarr"  # Name shown to users when more than one Radarr instance is configured
+radarr_instances = []  # Additional Radarr instances to search, e.g. [{"name": "Radarr 4K", "url": "http://192.168.0.100:7879", "api_key": "", "quality_profile_id": ["Ultra-HD"], "movie_paths": ["/movies-4k"]}] - quality_profile_id and movie_paths are optional
 
 # Readarr
 readarr_enabled = True
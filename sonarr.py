@@ -5,102 +5,80 @@ Sonarr API Wrapper
 By Todd Roberts
 https://github.com/toddrob99/searcharr
 """
-import requests
-import time
 from urllib.parse import quote
 
-from log import set_up_logger
+from arr import Arr, format_root_folders
 
 
-class Sonarr(object):
-    def __init__(self, api_url, api_key, verbose=False):
-        self.logger = set_up_logger("searcharr.sonarr", verbose, False)
-        self.logger.debug("Logging started!")
+# Only these fields of each library item are kept in memory
+SERIES_FIELDS = ["id", "title", "tvdbId", "imdbId"]
+
+
+class Sonarr(Arr):
+    app_name = "Sonarr"
+    endpoint_timeouts = dict(Arr.endpoint_timeouts, **{"series": 120})
+
+    def __init__(self, api_url, api_key, verbose=False, **kwargs):
+        super().__init__(verbose, **kwargs)
         if api_url[-1] == "/":
             api_url = api_url[:-1]
         if api_url[:4] != "http":
             self.logger.error(
                 "Invalid Sonarr URL detected. Please update your settings to include http:// or https:// on the beginning of the URL."
             )
-        self.sonarr_version = self.discover_version(api_url, api_key)
-        if not self.sonarr_version.startswith("4."):
-            self.api_url = api_url + "/api/{endpoint}?apikey=" + api_key
-        self._quality_profiles = self.get_all_quality_profiles()
-        self._root_folders = self.get_root_folders()
-        self._all_series = {}
-        self.get_all_series()
-
-    def discover_version(self, api_url, api_key):
-        try:
-            self.api_url = api_url + "/api/v3/{endpoint}?apikey=" + api_key
-            sonarrInfo = self._api_get("system/status")
-            self.logger.debug(
-                f"Discovered Sonarr version {sonarrInfo.get('version')} using v3 api."
-            )
-            return sonarrInfo.get("version")
-        except requests.exceptions.HTTPError as e:
-            self.logger.debug(f"Sonarr v3 API threw exception: {e}")
-
-        try:
-            self.api_url = api_url + "/api/{endpoint}?apikey=" + api_key
-            sonarrInfo = self._api_get("system/status")
-            self.logger.warning(
-                f"Discovered Sonarr version {sonarrInfo.get('version')}. Using legacy API. Consider upgrading to the latest version of Radarr for the best experience."
-            )
-            return sonarrInfo.get("version")
-        except requests.exceptions.HTTPError as e:
-            self.logger.debug(f"Sonarr legacy API threw exception: {e}")
+        self._timed("discover_version", self.discover_version, api_url, api_key)
+        self._all_series = self._library(
+            "series", ["tvdbId", "imdbId"], "series", SERIES_FIELDS
+        )
+        r = self._bootstrap(
+            quality_profiles=self.get_all_quality_profiles,
+            root_folders=self.get_root_folders,
+            series=self.get_all_series,
+        )
+        self._quality_profiles = r["quality_profiles"]
+        self._root_folders = r["root_folders"]
+
+    @property
+    def sonarr_version(self):
+        return self.version
 
-        self.logger.debug("Failed to discover Sonarr version")
-        return None
+    def _select_api_path(self, version, path):
+        return path if version.startswith("4.") else "/api"
 
     def lookup_series(self, title=None, tvdb_id=None):
-        r = self._api_get(
-            "series/lookup", {"term": f"tvdb:{tvdb_id}" if tvdb_id else quote(title)}
-        )
+        term = f"tvdb:{tvdb_id}" if tvdb_id else title
+        return self._cached_lookup(term, lambda: self._lookup_series(term))
+
+    def _lookup_series(self, term):
+        r = self._api_get("series/lookup", {"term": quote(term)})
         if not r:
             return []
 
         return [
-            {
-                "title": x.get("title"),
-                "seasonCount": len(x.get("seasons")),
-                "status": x.get("status", "Unknown Status"),
-                "overview": x.get("overview", "Overview not available."),
-                "network": x.get("network"),
-                "remotePoster": x.get(
-                    "remotePoster",
-                    "https://artworks.thetvdb.com/banners/images/missing/movie.jpg",
-                ),
-                "year": x.get("year"),
-                "tvdbId": x.get("tvdbId"),
-                "seriesType": x.get("seriesType"),
-                "imdbId": x.get("imdbId"),
-                "certification": x.get("certification"),
-                "id": x.get("id", self._series_internal_id(x.get("tvdbId"))),
-                "titleSlug": x.get("titleSlug"),
-                "cleanTitle": x.get("cleanTitle"),
-                "tvRageId": x.get("tvRageId"),
-                "images": x.get("images"),
-                "seasons": x.get("seasons"),
-                "genres": x.get("genres", []),
-            }
+            _series_result(
+                x, self._series_internal_id(x.get("tvdbId"), x.get("imdbId"))
+            )
             for x in r
         ]
 
-    def _series_internal_id(self, tvdb_id):
-        return next(
-            (x["id"] for x in self.get_all_series() if x.get("tvdbId", 0) == tvdb_id),
-            None,
-        )
+    def _series_internal_id(self, tvdb_id, imdb_id=None):
+        return self._all_series.find_id(tvdbId=tvdb_id, imdbId=imdb_id)
 
     def get_all_series(self):
-        if int(round(self._all_series.get("ts", 0))) < int(round(time.time())) - 30:
-            self.logger.debug("Refreshing all series cache...")
-            r = self._api_get("series", {})
-            self._all_series.update({"series": r, "ts": time.time()})
+        return self._all_series.get_all()
+
+    def handle_webhook(self, event):
+        event_type = event.get("eventType")
+        self.logger.debug(f"Received {event_type} webhook")
+        if event_type == "SeriesAdd":
+            self._all_series.upsert(event["series"])
+        elif event_type == "SeriesDelete":
+            self._all_series.remove(event["series"]["id"])
+        else:
+            return False
 
-        return self._all_series["series"]
+        self._invalidate_lookups()
+        return True
 
     def add_series(
         self,
@@ -122,134 +100,64 @@ class Sonarr(object):
             else:
                 return False
 
-        self.logger.debug(f"Additional data: {additional_data}")
+        # Concurrent adds of the same series share a single request
+        return self._single_flight(
+            ("add", series_info["tvdbId"]),
+            lambda: self._add_series(
+                series_info,
+                search,
+                season_folders,
+                monitored,
+                unmonitor_existing,
+                additional_data,
+            ),
+        )
 
-        path = additional_data["p"]
-        quality = int(additional_data["q"])
-        monitor_options = int(additional_data.get("m", 0))
-        if monitor_options == 1:
-            # Monitor only the first season
-            for s in series_info["seasons"]:
-                if s["seasonNumber"] != 1:
-                    s.update({"monitored": False})
-        elif monitor_options == 2:
-            if next(
-                (x for x in series_info["seasons"] if x["seasonNumber"] == 0), False
-            ):
-                # There is a Season 0
-                max_season = len(series_info["seasons"]) - 1
-            else:
-                max_season = len(series_info["seasons"])
-            # Monitor only the latest season
-            for s in series_info["seasons"]:
-                if s["seasonNumber"] != max_season:
-                    s.update({"monitored": False})
-        tags = additional_data.get("t", "")
-        if len(tags):
-            tag_ids = [int(x) for x in tags.split(",")]
-        else:
-            tag_ids = []
-
-        self.logger.debug(f"{series_info['seasons']=}")
-
-        params = {
-            "tvdbId": series_info["tvdbId"],
-            "title": series_info["title"],
-            "qualityProfileId": quality,
-            "titleSlug": series_info["titleSlug"],
-            "images": series_info["images"],
-            "seasons": series_info["seasons"],
-            "rootFolderPath": path,
-            "tvRageId": series_info["tvRageId"],
-            "seasonFolder": season_folders,
-            "monitored": monitored,
-            "seriesType": "anime" if additional_data.get("st") == "a" else "standard",
-            "tags": tag_ids,
-            "addOptions": {
-                "ignoreEpisodesWithFiles": unmonitor_existing,
-                "ignoreEpisodesWithoutFiles": False,
-                "searchForMissingEpisodes": search,
-            },
-        }
-
-        return self._api_post("series", params)
+    def _add_series(
+        self,
+        series_info,
+        search,
+        season_folders,
+        monitored,
+        unmonitor_existing,
+        additional_data,
+    ):
+        id = self._series_internal_id(series_info["tvdbId"], series_info.get("imdbId"))
+        if id:
+            self.logger.info(
+                f"[{series_info['title']}] is already in {self.name}, so not adding it again"
+            )
+            return self._all_series.get(id) or {"id": id}
 
-    def get_root_folders(self):
-        r = self._api_get("RootFolder", {})
-        if not r:
-            return []
+        self.logger.debug(f"Additional data: {additional_data}")
 
-        return [
-            {
-                "path": x.get("path"),
-                "freeSpace": x.get("freeSpace"),
-                "totalSpace": x.get("totalSpace"),
-                "id": x.get("id"),
-            }
-            for x in r
-        ]
+        # Searches are batched with other adds' when the scheduler is enabled
+        batched = search and self._searches is not None
+        params = _series_add_params(
+            series_info,
+            search and not batched,
+            season_folders,
+            monitored,
+            unmonitor_existing,
+            additional_data,
+        )
+        self.logger.debug(f"{params['seasons']=}")
 
-    def get_all_tags(self):
-        r = self._api_get("tag", {})
-        self.logger.debug(f"Result of API call to get all tags: {r}")
-        return [] if not r else r
+        r = self._api_post("series", params)
+        if r:
+            self._all_series.upsert(r)
+            self._invalidate_lookups()
+            if batched:
+                self._searches.schedule(r["id"])
+        return r
 
-    def get_filtered_tags(self, allowed_tags, excluded_tags):
-        r = self.get_all_tags()
-        if not r:
-            return []
-        elif allowed_tags == []:
-            return [
-                x
-                for x in r
-                if not x["label"].startswith("searcharr-")
-                and not x["label"] in excluded_tags
-            ]
-        else:
-            return [
-                x
-                for x in r
-                if not x["label"].startswith("searcharr-")
-                and (x["label"] in allowed_tags or x["id"] in allowed_tags)
-                and x["label"] not in excluded_tags
-            ]
-
-    def add_tag(self, tag):
-        params = {
-            "label": tag,
-        }
-        t = self._api_post("tag", params)
-        self.logger.debug(f"Result of API call to add tag: {t}")
-        return t
-
-    def get_tag_id(self, tag):
-        if i := next(
-            iter(
-                [
-                    x.get("id")
-                    for x in self.get_all_tags()
-                    if x.get("label").lower() == tag.lower()
-                ]
-            ),
-            None,
-        ):
-            self.logger.debug(f"Found tag id [{i}] for tag [{tag}]")
-            return i
-        else:
-            self.logger.debug(f"No tag id found for [{tag}]; adding...")
-            t = self.add_tag(tag)
-            if not isinstance(t, dict):
-                self.logger.error(
-                    f"Wrong data type returned from Sonarr API when attempting to add tag [{tag}]. Expected dict, got {type(t)}."
-                )
-                return None
-            else:
-                self.logger.debug(
-                    f"Created tag id for tag [{tag}]: {t['id']}"
-                    if t.get("id")
-                    else f"Could not add tag [{tag}]"
-                )
-            return t.get("id", None)
+    def _search_command(self, ids):
+        # SeriesSearch only takes one series at a time
+        for id in ids:
+            self._api_post("command", {"name": "SeriesSearch", "seriesId": id})
+
+    def get_root_folders(self):
+        return format_root_folders(self._api_get("RootFolder", {}))
 
     def lookup_quality_profile(self, v):
         # Look up quality profile from a profile name or id
@@ -268,24 +176,76 @@ class Sonarr(object):
             None,
         )
 
-    def _api_get(self, endpoint, params={}):
-        url = self.api_url.format(endpoint=endpoint)
-        for k, v in params.items():
-            url += f"&{k}={v}"
-        self.logger.debug(f"Submitting GET request: [{url}]")
-        r = requests.get(url)
-        if r.status_code not in [200, 201, 202, 204]:
-            r.raise_for_status()
-            return None
-        else:
-            return r.json()
-
-    def _api_post(self, endpoint, params={}):
-        url = self.api_url.format(endpoint=endpoint)
-        self.logger.debug(f"Submitting POST request: [{url}]; params: [{params}]")
-        r = requests.post(url, json=params)
-        if r.status_code not in [200, 201, 202, 204]:
-            r.raise_for_status()
-            return None
+
+def _series_result(x, internal_id):
+    return {
+        "title": x.get("title"),
+        "seasonCount": len(x.get("seasons")),
+        "status": x.get("status", "Unknown Status"),
+        "overview": x.get("overview", "Overview not available."),
+        "network": x.get("network"),
+        "remotePoster": x.get(
+            "remotePoster",
+            "https://artworks.thetvdb.com/banners/images/missing/movie.jpg",
+        ),
+        "year": x.get("year"),
+        "tvdbId": x.get("tvdbId"),
+        "seriesType": x.get("seriesType"),
+        "imdbId": x.get("imdbId"),
+        "certification": x.get("certification"),
+        "id": x.get("id", internal_id),
+        "titleSlug": x.get("titleSlug"),
+        "cleanTitle": x.get("cleanTitle"),
+        "tvRageId": x.get("tvRageId"),
+        "images": x.get("images"),
+        "seasons": x.get("seasons"),
+        "genres": x.get("genres", []),
+    }
+
+
+def _series_add_params(
+    series_info, search, season_folders, monitored, unmonitor_existing, additional_data
+):
+    path = additional_data["p"]
+    quality = int(additional_data["q"])
+    monitor_options = int(additional_data.get("m", 0))
+    if monitor_options == 1:
+        # Monitor only the first season
+        for s in series_info["seasons"]:
+            if s["seasonNumber"] != 1:
+                s.update({"monitored": False})
+    elif monitor_options == 2:
+        if next((x for x in series_info["seasons"] if x["seasonNumber"] == 0), False):
+            # There is a Season 0
+            max_season = len(series_info["seasons"]) - 1
         else:
-            return r.json()
+            max_season = len(series_info["seasons"])
+        # Monitor only the latest season
+        for s in series_info["seasons"]:
+            if s["seasonNumber"] != max_season:
+                s.update({"monitored": False})
+    tags = additional_data.get("t", "")
+    if len(tags):
+        tag_ids = [int(x) for x in tags.split(",")]
+    else:
+        tag_ids = []
+
+    return {
+        "tvdbId": series_info["tvdbId"],
+        "title": series_info["title"],
+        "qualityProfileId": quality,
+        "titleSlug": series_info["titleSlug"],
+        "images": series_info["images"],
+        "seasons": series_info["seasons"],
+        "rootFolderPath": path,
+        "tvRageId": series_info["tvRageId"],
+        "seasonFolder": season_folders,
+        "monitored": monitored,
+        "seriesType": "anime" if additional_data.get("st") == "a" else "standard",
+        "tags": tag_ids,
+        "addOptions": {
+            "ignoreEpisodesWithFiles": unmonitor_existing,
+            "ignoreEpisodesWithoutFiles": False,
+            "searchForMissingEpisodes": search,
+        },
+    }
@@ -0,0 +1,126 @@
+"""
+Searcharr
+Sonarr, Radarr & Readarr Telegram Bot
+Webhook Listener Tests
+By Todd Roberts
+https://github.com/toddrob99/searcharr
+"""
+import base64
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import sys
+from threading import Thread
+import unittest
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from radarr import Radarr  # noqa: E402
+from webhook import WebhookListener  # noqa: E402
+
+
+MOVIES = [
+    {"id": 1, "title": "Movie 1", "tmdbId": 1001, "imdbId": "tt1"},
+    {"id": 2, "title": "Movie 2", "tmdbId": 1002, "imdbId": "tt2"},
+]
+
+
+class FakeRadarr(BaseHTTPRequestHandler):
+    # Answers just enough of the Radarr API for Radarr() to start up
+    responses = {
+        "/api/v3/system/status": {"version": "4.0.0"},
+        "/api/v3/qualityprofile": [{"id": 1, "name": "HD"}],
+        "/api/v3/rootfolder": [{"id": 1, "path": "/movies"}],
+        "/api/v3/movie": MOVIES,
+    }
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        r = self.responses.get(self.path.split("?")[0].lower())
+        data = json.dumps(r).encode("utf-8")
+        self.send_response(404 if r is None else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(server):
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class WebhookListenerTests(unittest.TestCase):
+    def setUp(self):
+        self.arr = serve(ThreadingHTTPServer(("127.0.0.1", 0), FakeRadarr))
+        self.radarr = Radarr(
+            f"http://127.0.0.1:{self.arr.server_address[1]}",
+            "key",
+            version_cache_ttl=0,
+            search_batch_window=0,
+        )
+        self.listener = WebhookListener(
+            "127.0.0.1",
+            0,
+            {"radarr": self.radarr.handle_webhook},
+            password="secret",
+        )
+        self.listener.start()
+
+    def tearDown(self):
+        self.listener.stop()
+        self.arr.shutdown()
+        self.arr.server_close()
+
+    def post(self, body, password="secret", path="radarr"):
+        headers = {"Content-Type": "application/json"}
+        if password is not None:
+            creds = base64.b64encode(f"searcharr:{password}".encode("utf-8"))
+            headers["Authorization"] = f"Basic {creds.decode('utf-8')}"
+        req = Request(
+            f"http://127.0.0.1:{self.listener.port}/{path}",
+            data=json.dumps(body).encode("utf-8"),
+            headers=headers,
+        )
+        try:
+            with urlopen(req, timeout=5) as r:
+                return r.status
+        except HTTPError as e:
+            return e.code
+
+    def movie_ids(self):
+        return sorted(x["id"] for x in self.radarr.get_all_movies())
+
+    def test_wrong_or_missing_password(self):
+        event = {"eventType": "MovieDelete", "movie": {"id": 1}}
+        self.assertEqual(self.post(event, password="wrong"), 401)
+        self.assertEqual(self.post(event, password=None), 401)
+        self.assertEqual(self.movie_ids(), [1, 2])
+
+    def test_non_object_payload(self):
+        self.assertEqual(self.post(["MovieDelete"]), 400)
+        self.assertEqual(self.post("MovieDelete"), 400)
+        self.assertEqual(self.movie_ids(), [1, 2])
+
+    def test_unknown_path(self):
+        self.assertEqual(self.post({"eventType": "Test"}, path="sonarr"), 404)
+
+    def test_movie_added(self):
+        movie = {"id": 3, "title": "Movie 3", "tmdbId": 1003, "imdbId": "tt3"}
+        self.assertEqual(self.post({"eventType": "MovieAdded", "movie": movie}), 200)
+        self.assertEqual(self.movie_ids(), [1, 2, 3])
+        self.assertEqual(self.radarr._movie_internal_id(1003), 3)
+
+    def test_movie_deleted(self):
+        event = {"eventType": "MovieDelete", "movie": {"id": 1}}
+        self.assertEqual(self.post(event), 200)
+        self.assertEqual(self.movie_ids(), [2])
+        self.assertFalse(self.radarr._movie_internal_id(1001))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Searcharr
+Sonarr, Radarr & Readarr Telegram Bot
+Arr Webhook Listener
+By Todd Roberts
+https://github.com/toddrob99/searcharr
+"""
+import base64
+import hmac
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import ipaddress
+import json
+from threading import Thread
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class WebhookListener(object):
+    def __init__(self, host, port, handlers, password=None, logger=None):
+        # handlers maps a url path (e.g. "sonarr") to a callable accepting the event payload
+        self.handlers = handlers
+        self.password = password
+        self.logger = logger
+        self._server = ThreadingHTTPServer((host, port), self._request_handler())
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread = Thread(
+            target=self._server.serve_forever, name="webhook-listener", daemon=True
+        )
+        self._thread.start()
+        if self.logger:
+            self.logger.info(
+                f"Listening for webhooks on port {self.port} for: {list(self.handlers.keys())}"
+            )
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _authorized(self, header):
+        if not self.password:
+            return True
+        try:
+            scheme, creds = header.split(" ", 1)
+            _, password = base64.b64decode(creds).decode("utf-8").split(":", 1)
+        except (AttributeError, ValueError):
+            return False
+        return scheme.lower() == "basic" and hmac.compare_digest(
+            password.encode("utf-8"), str(self.password).encode("utf-8")
+        )
+
+    def _request_handler(self):
+        listener = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                if listener.logger:
+                    listener.logger.debug(f"Webhook request: {format % args}")
+
+            def do_POST(self):
+                handler = listener.handlers.get(self.path.strip("/").split("?")[0])
+                if not handler:
+                    return self._reply(404)
+                if not listener._authorized(self.headers.get("Authorization")):
+                    return self._reply(401)
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    event = json.loads(self.rfile.read(length))
+                except ValueError as e:
+                    if listener.logger:
+                        listener.logger.error(f"Invalid webhook payload: {e}")
+                    return self._reply(400)
+                if not isinstance(event, dict):
+                    if listener.logger:
+                        listener.logger.error(
+                            f"Invalid webhook payload: expected an object, got {type(event).__name__}"
+                        )
+                    return self._reply(400)
+
+                try:
+                    handler(event)
+                except Exception as e:
+                    if listener.logger:
+                        listener.logger.error(
+                            f"Error handling {event.get('eventType')} webhook: {e}"
+                        )
+                    return self._reply(500)
+                self._reply(200)
+
+            def _reply(self, code):
+                self.send_response(code)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        return Handler